@@ -1,24 +1,31 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Path, Query, Depends, Request
-from fastapi.responses import FileResponse as FastAPIFileResponse, Response
-from typing import List, Dict, Optional, Any
+from fastapi.responses import FileResponse as FastAPIFileResponse, Response, StreamingResponse
+from typing import List, Dict, Optional, Any, Tuple
 import os
+import asyncio
+import struct
 import datetime 
 import json
 import uuid
 import shutil
 import aiofiles
 from pathlib import Path
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 import aiohttp
+from tortoise.transactions import in_transaction
 import models
 import models_factory
 from models import TreeItem, User, ChunkedUploadSession, TaskRecord
-from services import FileService, CollectionsService, georeference
+from services import FileService, CollectionsService, TileCache, TileRenderer, georeference
+from services.metadata_cache import FileMetadata, FileMetadataCache, publish_invalidation
+from services.collections import encode_cursor, SEARCH_COUNT_MODES
+from services.files import CHUNK_SIZE_MIN, CHUNK_SIZE_MAX, CHUNKED_UPLOAD_THRESHOLD, MAX_UPLOAD_SIZE
 from services.geo import analyze_raster_file
+from services.executor import blocking_pool
 from mapserver_service import MapServerService
 from auth import get_current_user, get_current_user_optional, require_permission, Permission
-from tasks import convert_to_geo_raster_task, apply_georeferencing_task, cancel_task
+from tasks import convert_to_geo_raster_task, apply_georeferencing_task, ingest_file_task, cancel_task
 from task_records import get_task_records_by_item, get_task_record, create_task_record
 from celery_app import celery_app
 
@@ -27,6 +34,21 @@ router = APIRouter(tags=["files"])
 
 # Initialize services
 mapserver_service = MapServerService()
+tile_cache = TileCache()
+tile_renderer = TileRenderer()
+file_metadata_cache = FileMetadataCache()
+
+# Tile backend: "mapserver" proxies WMS GetMap, "gdal" renders in-process,
+# "auto" renders Cloud-Optimized GeoTIFFs in-process and proxies everything else
+TILE_BACKEND = os.getenv("TILE_BACKEND", "mapserver").lower()
+
+# Maximum number of files and chunked uploads accepted by POST /files/batch
+MAX_FILES_PER_BATCH = int(os.getenv("MAX_FILES_PER_BATCH", "500"))
+
+# Upload ingest: "sync" analyzes and registers files within the upload request, "async"
+# stores them as a RawFile and finishes registration in tasks.ingest_file_task
+INGEST_MODE = os.getenv("INGEST_MODE", "sync").lower()
+VALID_INGEST_MODES = ("sync", "async")
 
 
 # Unified Pydantic models
@@ -41,11 +63,29 @@ class TreeItemResponse(BaseModel):
     created_at: datetime.datetime
     updated_at: datetime.datetime
     path: str
+    child_count: int = 0  # Number of direct children, 0 for files
 
     permissions: int
     owner_user_id: uuid.UUID | None
     owner_group_id: uuid.UUID | None
 
+class FileUploadResponse(TreeItemResponse):
+    task_id: Optional[str] = None  # Ingest task, set in async ingest mode
+
+
+class FileBatchUploadResult(BaseModel):
+    filename: Optional[str] = None
+    upload_id: Optional[str] = None  # Set for chunked uploads
+    item: Optional[FileUploadResponse] = None  # Set if the file was created
+    error: Optional[str] = None  # Set if the file was not created
+
+
+class FileBatchUploadResponse(BaseModel):
+    results: list[FileBatchUploadResult]  # In request order, files first, then chunked uploads
+    created: int
+    failed: int
+
+
 class TreeItemDetails(TreeItemResponse):
     object_details: models.KnownTreeItemTypes | None = None
 
@@ -56,6 +96,7 @@ class TreeItemListResponse(BaseModel):
     skip: int
     limit: int
     leaf: TreeItemResponse
+    next_cursor: Optional[str] = None  # Pass as cursor to get the next page, None on the last page
 
 
 class TreeItemContentsResponse(BaseModel):
@@ -81,6 +122,7 @@ class TreeItemCreateRequest(BaseModel):
 
 VALID_OBJECT_TYPES = {"raw_file", "geo_raster_file", "collection"}
 VALID_SEARCH_TYPES = {"file", "collection"}
+VALID_SPATIAL_RELATIONS = {"intersects", "contains", "within"}
 
 
 class TreeItemSearchRequest(BaseModel):
@@ -91,15 +133,21 @@ class TreeItemSearchRequest(BaseModel):
     collection_path: Optional[str] = None  # Scope search to descendants of this path
     created_after: Optional[datetime.datetime] = None
     created_before: Optional[datetime.datetime] = None
+    bbox: Optional[List[float]] = None  # [min_x, min_y, max_x, max_y] in WGS84, matches geo raster footprints
+    spatial_relation: str = "intersects"  # "intersects", "contains" or "within"
     skip: int = 0
     limit: int = 100
+    cursor: Optional[str] = None  # next_cursor of the previous page, faster than skip for deep pages
+    count_mode: str = "exact"  # "exact", "estimated" (planner estimate) or "capped" (stops at SEARCH_COUNT_CAP)
 
 
 class TreeItemSearchResponse(BaseModel):
     items: list[TreeItemResponse]
     total: int
+    total_is_estimate: bool = False
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 # Georeferencing-specific models
@@ -115,6 +163,23 @@ class ControlPointsRequest(BaseModel):
     target_srs: str = "EPSG:4326"
 
 
+class TileCoordinate(BaseModel):
+    z: int = Field(ge=0, le=30)
+    x: int = Field(ge=0)
+    y: int = Field(ge=0)
+
+    @model_validator(mode="after")
+    def check_tile_in_grid(self):
+        # Zoom level z has 2**z tiles per axis
+        if self.x >= 2 ** self.z or self.y >= 2 ** self.z:
+            raise ValueError(f"Tile {self.z}/{self.x}/{self.y} is outside the grid of zoom level {self.z}")
+        return self
+
+
+class TileBatchRequest(BaseModel):
+    tiles: List[TileCoordinate]
+
+
 class GeoreferencingApplyRequest(BaseModel):
     control_points: List[ControlPointModel]
     control_points_srs: str = "EPSG:4326"
@@ -123,10 +188,20 @@ class GeoreferencingApplyRequest(BaseModel):
 # Chunked upload models
 class ChunkedUploadInitRequest(BaseModel):
     filename: str
-    file_size: int
+    file_size: int = Field(ge=0)
     mime_type: Optional[str] = None
     tags: Optional[Dict[str, Any]] = None
     parent_path: Optional[str] = "root"
+    chunk_size: Optional[int] = None  # Requested chunk size, clamped to the server limits
+
+
+class ChunkedUploadConfigResponse(BaseModel):
+    min_chunk_size: int
+    max_chunk_size: int
+    recommended_chunk_size: Optional[int] = None  # Only if file_size was given
+    chunked_upload_threshold: int  # Smaller files should use POST /files
+    max_upload_size: int  # Larger files are rejected at /files/chunked/init
+    use_chunked_upload: Optional[bool] = None  # Only if file_size was given
 
 
 class ChunkedUploadInitResponse(BaseModel):
@@ -143,7 +218,19 @@ class ChunkedUploadChunkRequest(BaseModel):
 
 class ChunkedUploadCompleteRequest(BaseModel):
     upload_id: str
+    # Optional composite checksum: sha256 over the concatenated binary sha256 digests of all
+    # chunks, in chunk order. This is a hash of the chunk hashes, not a digest of the whole file.
     checksum: Optional[str] = None
+    ingest_mode: Optional[str] = None  # "sync" or "async", defaults to INGEST_MODE
+
+
+class ChunkedUploadStatusResponse(BaseModel):
+    upload_id: str
+    chunk_size: int
+    total_chunks: int
+    chunks_received: int
+    missing_chunks: List[List[int]]  # Inclusive [first, last] chunk number ranges still to upload
+    expires_at: datetime.datetime
 
 
 # Task management models
@@ -179,26 +266,38 @@ async def list_tree_items(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     collection_path: Optional[str] = Query("root"),
+    cursor: Optional[str] = Query(None),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """List tree items with optional filters"""
+    """List tree items with optional filters
+    
+    Pages can be requested with skip/limit, or with the next_cursor of the previous
+    page, which costs the same for every page.
+    """
     collection = await CollectionsService.get_collection_by_path(collection_path)
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
     
     await require_permission(collection, current_user, Permission.READ)
 
-    result_items = await CollectionsService.list_collection_contents(collection_path, skip, limit)
+    # Items the user cannot read are filtered out in SQL, so pages and totals stay consistent
+    try:
+        result_items = await CollectionsService.list_collection_contents(
+            collection_path, skip, limit, cursor=cursor, user=current_user, check_permissions=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     items = [TreeItemResponse.model_validate(item) for item in result_items]
-    total = len(items)  # Since we don't have total counters anymore, use actual count
+    total = await CollectionsService.count_collection_contents(
+        collection, user=current_user, check_permissions=True)
 
     return TreeItemListResponse(
         items=items,
         total=total,
         skip=skip,
         limit=limit,
-        leaf=TreeItemResponse.model_validate(collection)
+        leaf=TreeItemResponse.model_validate(collection),
+        next_cursor=encode_cursor(result_items[-1]) if len(result_items) == limit else None
     )
 
 
@@ -216,6 +315,12 @@ async def search_tree_items(
     - name: case-insensitive substring match
     - collection_path: scope search to a subtree
     - created_after / created_before: date range filters
+    - bbox / spatial_relation: geo raster files whose WGS84 footprint intersects,
+      contains or lies within a bounding box (a point bbox with "contains" finds
+      the maps covering that point)
+
+    count_mode "estimated" or "capped" avoids an exact COUNT(*) over large
+    result sets, total_is_estimate is set when the total is not exact.
     """
     if search.limit < 1 or search.limit > 1000:
         raise HTTPException(status_code=422, detail="limit must be between 1 and 1000")
@@ -238,6 +343,19 @@ async def search_tree_items(
                 detail=f"object_type '{search.object_type}' conflicts with type '{search.type}'"
             )
 
+    if search.count_mode not in SEARCH_COUNT_MODES:
+        raise HTTPException(status_code=422, detail=f"count_mode must be one of: {', '.join(SEARCH_COUNT_MODES)}")
+    if search.spatial_relation not in VALID_SPATIAL_RELATIONS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"spatial_relation must be one of: {', '.join(VALID_SPATIAL_RELATIONS)}"
+        )
+    if search.bbox is not None:
+        if len(search.bbox) != 4:
+            raise HTTPException(status_code=422, detail="bbox must be [min_x, min_y, max_x, max_y]")
+        if search.bbox[0] > search.bbox[2] or search.bbox[1] > search.bbox[3]:
+            raise HTTPException(status_code=422, detail="bbox minimum must not exceed maximum")
+
     # Require collection_path to scope the search — prevents unrestricted enumeration
     if not search.collection_path:
         raise HTTPException(
@@ -250,23 +368,34 @@ async def search_tree_items(
         raise HTTPException(status_code=404, detail="Collection not found")
     await require_permission(collection, current_user, Permission.READ)
 
-    items, total = await CollectionsService.search_items(
-        type=search.type,
-        object_type=search.object_type,
-        tags=search.tags,
-        name=search.name,
-        collection_path=search.collection_path,
-        created_after=search.created_after,
-        created_before=search.created_before,
-        skip=search.skip,
-        limit=search.limit,
-    )
+    try:
+        items, total, total_is_estimate = await CollectionsService.search_items(
+            type=search.type,
+            object_type=search.object_type,
+            tags=search.tags,
+            name=search.name,
+            collection_path=search.collection_path,
+            created_after=search.created_after,
+            created_before=search.created_before,
+            bbox=search.bbox,
+            spatial_relation=search.spatial_relation,
+            skip=search.skip,
+            limit=search.limit,
+            cursor=search.cursor,
+            count_mode=search.count_mode,
+            user=current_user,
+            check_permissions=True,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return TreeItemSearchResponse(
         items=[TreeItemResponse.model_validate(item) for item in items],
         total=total,
+        total_is_estimate=total_is_estimate,
         skip=search.skip,
         limit=search.limit,
+        next_cursor=encode_cursor(items[-1]) if len(items) == search.limit else None,
     )
 
 
@@ -320,36 +449,55 @@ async def update_tree_item(
     
     await require_permission(item, current_user, Permission.WRITE)
     
+    # Only write changed columns, a full save would overwrite child_count with a stale value
+    update_fields = ["updated_at"]
+    
     if request.permissions is not None:
         item.permissions = request.permissions
+        update_fields.append("permissions")
     
     if request.name is not None:
         item.name = request.name
+        update_fields.append("name")
     
     if request.tags is not None:
         item.tags = request.tags
-    
-    if request.parent_path is not None:
-        # Update the item's path based on the new parent
-        old_path = item.path
-        path_parts = old_path.split('.')
-        item_segment = path_parts[-1]  # Keep the same item ID segment
-        
-        new_path = f"{request.parent_path}.{item_segment}"
-        
-        item.path = new_path
-        
-        # update all descendant paths
-        from tortoise import connections
-        connection = connections.get("default")
+        update_fields.append("tags")
+    
+    async with in_transaction() as connection:
+        if request.parent_path is not None and request.parent_path != item.parent_path:
+            # The target is locked so it cannot be deleted or moved before the counters are adjusted
+            target = await models.TreeItem.filter(
+                path=request.parent_path, object_type="collection"
+            ).select_for_update().using_db(connection).first()
+            if not target:
+                raise HTTPException(status_code=404, detail="Collection not found")
+            if request.parent_path == item.path or request.parent_path.startswith(f"{item.path}."):
+                raise HTTPException(status_code=400, detail="Cannot move an item into itself or its descendants")
+            
+            # Update the item's path based on the new parent
+            old_path = item.path
+            old_parent_path = item.parent_path
+            path_parts = old_path.split('.')
+            item_segment = path_parts[-1]  # Keep the same item ID segment
+            
+            new_path = f"{request.parent_path}.{item_segment}"
+            
+            item.path = new_path
+            item.parent_path = request.parent_path
+            update_fields += ["path", "parent_path"]
+            
+            # update all descendant paths and the child counters of both collections
+            await CollectionsService._update_descendant_paths(old_path, new_path, connection=connection)
+            await CollectionsService.adjust_child_count(old_parent_path, -1, connection=connection)
+            await CollectionsService.adjust_child_count(request.parent_path, 1, connection=connection)
         
-        # Update all tree items (both files and collections) that are descendants
-        await connection.execute_query(
-            "UPDATE tree_items SET path = $1 || subpath(path, nlevel($2)) WHERE path <@ $2 AND path != $2",
-            [new_path, old_path]
-        )
+        await item.save(update_fields=update_fields, using_db=connection)
     
-    await item.save()
+    if "permissions" in update_fields:
+        # Tile endpoints check permissions on the cached metadata
+        file_metadata_cache.invalidate(str(item.id))
+        await asyncio.to_thread(publish_invalidation, str(item.id))
     
     return TreeItemResponse.model_validate(item)
 
@@ -373,16 +521,29 @@ async def delete_tree_item(
     #       but this requires implementation of check "is_deletable"
     # Try to delete as file first, then as collection
     success = await FileService.delete_file(str(item_id))
+    deleted = [{"id": item.id, "object_type": item.object_type, "object_id": item.object_id}]
     
     if not success:
         try:
-            success = await CollectionsService.delete_collection(str(item_id), force=force)
+            deleted = await CollectionsService.delete_collection(str(item_id), force=force)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
+        success = bool(deleted)
     
     if not success:
         raise HTTPException(status_code=404, detail="Tree item not found")
     
+    # Files deleted with a collection are cached like any other file
+    deleted_ids = [str(row["id"]) for row in deleted]
+    for deleted_id in deleted_ids:
+        file_metadata_cache.invalidate(deleted_id)
+    await asyncio.to_thread(publish_invalidation, *deleted_ids)
+    
+    # Rendered tiles of deleted files would stay on disk until evicted
+    for row in deleted:
+        if row["object_type"] == "geo_raster_file":
+            await blocking_pool.run(tile_cache.invalidate, row["object_id"])
+    
     return {"message": "Tree item deleted successfully"}
 
 
@@ -412,18 +573,99 @@ async def create_tree_item(request: TreeItemCreateRequest, current_user: Optiona
 # ======================
 
 # File upload, download, and geospatial-specific endpoints
-@router.post("/files", response_model=TreeItemResponse)
+def _resolve_ingest_mode(ingest_mode: Optional[str]) -> str:
+    ingest_mode = (ingest_mode or INGEST_MODE).lower()
+    if ingest_mode not in VALID_INGEST_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid ingest_mode, expected one of: {', '.join(VALID_INGEST_MODES)}"
+        )
+    return ingest_mode
+
+
+async def _register_uploaded_files(
+    file_infos: List[Dict[str, Any]],
+    tags: Dict[str, Any],
+    parent_path: str,
+    user: User,
+    ingest_mode: str
+) -> List[FileUploadResponse]:
+    """Create the records for files saved to disk, in one transaction
+    
+    In sync mode the files are analyzed concurrently first and georeferenced ones
+    are saved as GeoRasterFile. In async mode they are saved as RawFile right away
+    and the analysis runs in tasks.ingest_file_task, whose ID is returned per file.
+    """
+    responses = await _create_uploaded_file_records(file_infos, tags, parent_path, user, ingest_mode)
+    if ingest_mode == "async":
+        await _queue_ingest_tasks(responses)
+    return responses
+
+
+async def _create_uploaded_file_records(
+    file_infos: List[Dict[str, Any]],
+    tags: Dict[str, Any],
+    parent_path: str,
+    user: User,
+    ingest_mode: str
+) -> List[FileUploadResponse]:
+    """Analyze the files and create their records, without queueing ingest tasks"""
+    if ingest_mode == "async":
+        files = [{**file_info, "object_type": "raw_file"} for file_info in file_infos]
+    else:
+        # GDAL may take seconds on large PDFs and TIFFs, keep it off the event loop
+        analyses = await asyncio.gather(*(
+            blocking_pool.run(analyze_raster_file, file_info["file_path"]) for file_info in file_infos
+        ))
+        files = [{**file_info, "analysis": analysis} for file_info, analysis in zip(file_infos, analyses)]
+    
+    tree_items = await models_factory.create_files_bulk(
+        files, tags=tags, parent_path=parent_path, owner_user_id=user.id, permissions=0o644)
+    
+    return [FileUploadResponse.model_validate(tree_item) for tree_item in tree_items]
+
+
+async def _queue_ingest_tasks(responses: List[FileUploadResponse]):
+    """Queue tasks.ingest_file_task for created files and set their task_id"""
+    # Queue only after the tree items are saved, the task updates them
+    for response in responses:
+        task = ingest_file_task.delay(str(response.id))
+        await create_task_record(
+            task_id=task.id,
+            item_type="tree_item",
+            item_id=str(response.id)
+        )
+        response.task_id = task.id
+
+
+async def _register_uploaded_file(
+    file_info: Dict[str, Any],
+    tags: Dict[str, Any],
+    parent_path: str,
+    user: User,
+    ingest_mode: str
+) -> FileUploadResponse:
+    """Create the records for a single file saved to disk, see _register_uploaded_files"""
+    responses = await _register_uploaded_files([file_info], tags, parent_path, user, ingest_mode)
+    return responses[0]
+
+
+@router.post("/files", response_model=FileUploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
     tags: Optional[str] = Form(None),
     parent_path: Optional[str] = Form("root"),
+    ingest_mode: Optional[str] = Form(None),
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """Upload a new file with automatic georeferencing detection
     
     If the uploaded file is already georeferenced (has projection and geotransform),
     it will be saved as a GeoRasterFile. Otherwise, it will be saved as a RawFile.
+    With ingest_mode "async" the response is sent before the file is analyzed and
+    contains the task_id of the ingest task.
     """
+    ingest_mode = _resolve_ingest_mode(ingest_mode)
     file_tags = {}
     if tags:
         try:
@@ -439,34 +681,155 @@ async def upload_file(
 
     file_info = await FileService.save_uploaded_file(file)
 
-    analysis = analyze_raster_file(file_info["file_path"])
-    is_georeferenced = analysis.get("is_georeferenced", False)
+    return await _register_uploaded_file(
+        file_info, file_tags, parent_path or "root", current_user, ingest_mode)
 
-    if is_georeferenced:
-        file_obj = await models_factory.create_geo_file(
-            file_info, file_tags, parent_path=parent_path or "root")
-    else:
-        file_obj = await models_factory.create_file(
-            file_info, file_tags, parent_path=parent_path or "root")
-    
 
-    file_obj.owner_user_id = current_user.id
-    file_obj.permissions = 0o644
-    await file_obj.save()
+@router.post("/files/batch", response_model=FileBatchUploadResponse)
+async def upload_files_batch(
+    files: List[UploadFile] = File(default=[]),
+    upload_ids: Optional[str] = Form(None),
+    checksums: Optional[str] = Form(None),
+    tags: Optional[str] = Form(None),
+    parent_path: Optional[str] = Form("root"),
+    ingest_mode: Optional[str] = Form(None),
+    current_user: Optional[User] = Depends(get_current_user)
+):
+    """Upload many files into one collection with a single request
+    
+    Takes the files of the multipart body and upload_ids, a JSON list of chunked
+    uploads whose chunks were all sent. Chunked uploads are completed like
+    /files/chunked/complete: they go to the collection and get the tags given at
+    init, and checksums, a JSON object of upload ID to checksum, is verified.
+    The collection and the permission are checked once, the files are analyzed
+    concurrently and registered in one transaction. Results are listed per file,
+    a file that fails does not affect the others. If the transaction fails no
+    file is registered and the chunked uploads can be completed again.
+    """
+    ingest_mode = _resolve_ingest_mode(ingest_mode)
+    
+    file_tags = {}
+    if tags:
+        try:
+            file_tags = json.loads(tags)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid tags format")
+    
+    chunked_upload_ids = []
+    if upload_ids:
+        try:
+            chunked_upload_ids = json.loads(upload_ids)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid upload_ids format")
+        if not isinstance(chunked_upload_ids, list) or not all(isinstance(upload_id, str) for upload_id in chunked_upload_ids):
+            raise HTTPException(status_code=400, detail="upload_ids must be a JSON list of upload IDs")
+    
+    upload_checksums = {}
+    if checksums:
+        try:
+            upload_checksums = json.loads(checksums)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid checksums format")
+        if not isinstance(upload_checksums, dict) or not all(isinstance(checksum, str) for checksum in upload_checksums.values()):
+            raise HTTPException(status_code=400, detail="checksums must be a JSON object of upload ID to checksum")
+    
+    if not files and not chunked_upload_ids:
+        raise HTTPException(status_code=400, detail="No files given")
+    if len(files) + len(chunked_upload_ids) > MAX_FILES_PER_BATCH:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_FILES_PER_BATCH} files can be uploaded at once")
+    
+    parent_path = parent_path or "root"
+    if files:
+        # Chunked uploads were checked against their own collection at init
+        collection = await CollectionsService.get_collection_by_path(parent_path)
+        if not collection:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        
+        await require_permission(collection, current_user, Permission.WRITE)
+    
+    results = []
+    saved = []  # (result, file_info, session) of every file that reached the upload directory
+    for file in files:
+        result = FileBatchUploadResult(filename=file.filename)
+        results.append(result)
+        try:
+            saved.append((result, await FileService.save_uploaded_file(file), None))
+        except OSError as e:
+            result.error = f"Could not save file: {e}"
+    
+    for upload_id in chunked_upload_ids:
+        result = FileBatchUploadResult(upload_id=upload_id)
+        results.append(result)
+        try:
+            session, file_info = await _finalize_chunked_upload(
+                upload_id, current_user, upload_checksums.get(upload_id))
+        except HTTPException as e:
+            result.error = e.detail
+            continue
+        result.filename = session.filename
+        file_info["tags"] = session.tags or {}  # Never the batch tags, like /files/chunked/complete
+        file_info["parent_path"] = session.parent_path
+        saved.append((result, file_info, session))
+    
+    responses = []
+    if saved:
+        try:
+            responses = await _create_uploaded_file_records(
+                [file_info for _, file_info, _ in saved], file_tags, parent_path, current_user, ingest_mode)
+        except Exception as e:
+            # Nothing was registered, move the chunked uploads back so they can be completed again
+            print(f"Error registering batch upload: {e}")
+            for result, file_info, session in saved:
+                if session:
+                    await blocking_pool.run(
+                        FileService.restore_chunked_upload, session.temp_dir, file_info["file_path"])
+                else:
+                    await blocking_pool.run(FileService.remove_uploaded_file, file_info["file_path"])
+                result.error = f"Could not register file: {e}"
+            saved = []
+        
+        for (result, _, _), response in zip(saved, responses):
+            result.item = response
+    
+    # Clean up temp directories and sessions of the registered chunked uploads
+    for _, _, session in saved:
+        if session:
+            await blocking_pool.run(shutil.rmtree, session.temp_dir, ignore_errors=True)
+            await session.delete()
+    
+    if responses and ingest_mode == "async":
+        await _queue_ingest_tasks(responses)
     
-    return TreeItemResponse.model_validate(file_obj)
+    created = sum(1 for result in results if result.item is not None)
+    return FileBatchUploadResponse(results=results, created=created, failed=len(results) - created)
 
 
 # ======================
 # CHUNKED UPLOAD ENDPOINTS
 # ======================
 
+@router.get("/files/chunked/config", response_model=ChunkedUploadConfigResponse)
+async def get_chunked_upload_config(file_size: Optional[int] = Query(None, ge=0)):
+    """Get chunk size limits and, for a given file size, the recommended upload strategy"""
+    return ChunkedUploadConfigResponse(
+        min_chunk_size=CHUNK_SIZE_MIN,
+        max_chunk_size=CHUNK_SIZE_MAX,
+        recommended_chunk_size=FileService.recommend_chunk_size(file_size) if file_size is not None else None,
+        chunked_upload_threshold=CHUNKED_UPLOAD_THRESHOLD,
+        max_upload_size=MAX_UPLOAD_SIZE,
+        use_chunked_upload=file_size > CHUNKED_UPLOAD_THRESHOLD if file_size is not None else None
+    )
+
+
 @router.post("/files/chunked/init", response_model=ChunkedUploadInitResponse)
 async def init_chunked_upload(
     request: ChunkedUploadInitRequest,
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """Initialize a chunked upload session"""
+    if request.file_size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"Files larger than {MAX_UPLOAD_SIZE} bytes cannot be uploaded")
+    
     collection = await CollectionsService.get_collection_by_path(request.parent_path or "root")
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -475,12 +838,19 @@ async def init_chunked_upload(
 
     # Generate upload ID and calculate chunks
     upload_id = str(uuid.uuid4())
-    chunk_size = 75 * 1024 * 1024  # 100MB chunks
+    if request.chunk_size:
+        chunk_size = FileService.clamp_chunk_size(request.chunk_size)
+    else:
+        chunk_size = FileService.recommend_chunk_size(request.file_size)
     total_chunks = (request.file_size + chunk_size - 1) // chunk_size
 
-    # Create temp directory for chunks
+    # Create temp directory with the sparse file chunks are written into
     temp_dir = os.path.join("uploads", "temp", upload_id)
-    os.makedirs(temp_dir, exist_ok=True)
+    try:
+        await blocking_pool.run(FileService.preallocate_chunked_upload, temp_dir, request.file_size)
+    except OSError as e:
+        await blocking_pool.run(shutil.rmtree, temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=507, detail=f"Cannot allocate upload file: {e}")
 
     # Set expiration time (24 hours from now)
     expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=24)
@@ -513,9 +883,14 @@ async def upload_chunk(
     upload_id: str = Form(...),
     chunk_number: int = Form(...),
     chunk_data: UploadFile = File(...),
+    checksum: Optional[str] = Form(None),
     current_user: Optional[User] = Depends(get_current_user)
 ):
-    """Upload a single chunk"""
+    """Upload a single chunk
+    
+    Chunks may be uploaded in any order and in parallel. If checksum (sha256 hex
+    of the chunk) is given, the chunk is only accepted if it matches.
+    """
     # Get upload session from database
     session = await ChunkedUploadSession.get_or_none(upload_id=upload_id)
     if not session:
@@ -532,33 +907,46 @@ async def upload_chunk(
     if chunk_number < 0 or chunk_number >= session.total_chunks:
         raise HTTPException(status_code=400, detail="Invalid chunk number")
     
-    # Save chunk
-    chunk_path = os.path.join(session.temp_dir, f"chunk_{chunk_number}")
-    content = await chunk_data.read()
+    # A re-sent chunk overwrites the recorded data, so it no longer counts as received
+    # until the new data passed the checks below
+    if chunk_number in session.chunks_received:
+        await session.discard_chunk(chunk_number)
     
-    async with aiofiles.open(chunk_path, 'wb') as f:
-        await f.write(content)
+    # Write the chunk directly at its final offset, every chunk but the last has chunk_size bytes
+    offset = chunk_number * session.chunk_size
+    expected_size = min(session.chunk_size, session.file_size - offset)
+    try:
+        written, chunk_checksum = await FileService.write_chunk(
+            session.temp_dir, offset, chunk_data, max_size=expected_size)
+    except FileNotFoundError:
+        # A late retry, the upload file was moved away by /files/chunked/complete
+        raise HTTPException(status_code=409, detail="Upload session is already completed")
+    if written != expected_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk {chunk_number} has {written} bytes, expected {expected_size}"
+        )
+    if checksum and checksum.lower() != chunk_checksum:
+        raise HTTPException(status_code=400, detail=f"Checksum mismatch for chunk {chunk_number}")
     
-    # Mark chunk as received in database
-    session.add_chunk(chunk_number)
-    await session.save()
+    # Mark chunk as received in database, safe with chunks uploaded in parallel
+    chunks_received = await session.record_chunk(chunk_number, chunk_checksum)
     
     return {
         "message": "Chunk uploaded successfully",
         "chunk_number": chunk_number,
-        "chunks_received": len(session.chunks_received),
+        "chunks_received": chunks_received,
         "total_chunks": session.total_chunks
     }
 
 
-@router.post("/files/chunked/complete", response_model=TreeItemResponse)
-async def complete_chunked_upload(
-    request: ChunkedUploadCompleteRequest,
+@router.get("/files/chunked/{upload_id}/status", response_model=ChunkedUploadStatusResponse)
+async def get_chunked_upload_status(
+    upload_id: str,
     current_user: Optional[User] = Depends(get_current_user)
 ):
-    """Complete the chunked upload and create the file"""
-    # Get upload session from database
-    session = await ChunkedUploadSession.get_or_none(upload_id=request.upload_id)
+    """Get the chunks of an upload that still have to be sent, used to resume interrupted uploads"""
+    session = await ChunkedUploadSession.get_or_none(upload_id=upload_id)
     if not session:
         raise HTTPException(status_code=404, detail="Upload session not found")
     
@@ -566,27 +954,87 @@ async def complete_chunked_upload(
     if session.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Check if session has expired
     if session.is_expired():
-        # Clean up expired session
-        shutil.rmtree(session.temp_dir, ignore_errors=True)
-        await session.delete()
         raise HTTPException(status_code=410, detail="Upload session has expired")
     
-    # Check if all chunks are received
-    if not session.is_complete():
-        missing_chunks = set(range(session.total_chunks)) - set(session.chunks_received)
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Missing chunks: {sorted(missing_chunks)}"
-        )
-    
-    # Combine chunks into final file
-    final_file_path = await FileService.combine_chunks(
-        session.temp_dir, 
-        session.total_chunks, 
-        session.filename
+    return ChunkedUploadStatusResponse(
+        upload_id=session.upload_id,
+        chunk_size=session.chunk_size,
+        total_chunks=session.total_chunks,
+        chunks_received=len(session.chunks_received),
+        missing_chunks=session.get_missing_ranges(),
+        expires_at=session.expires_at
     )
+
+
+@router.delete("/files/chunked/{upload_id}")
+async def abort_chunked_upload(
+    upload_id: str,
+    current_user: Optional[User] = Depends(get_current_user)
+):
+    """Abort a chunked upload and free its temporary storage right away"""
+    session = await ChunkedUploadSession.get_or_none(upload_id=upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    # Check if session belongs to current user
+    if session.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    await blocking_pool.run(FileService.remove_upload_dir, session.temp_dir)
+    await session.delete()
+    
+    return {"message": "Upload session aborted"}
+
+
+async def _finalize_chunked_upload(
+    upload_id: str,
+    user: User,
+    checksum: Optional[str] = None
+) -> Tuple[ChunkedUploadSession, Dict[str, Any]]:
+    """Check that a chunked upload is complete and move its file to the upload path
+    
+    Returns the session, which the caller deletes once the file is registered, and
+    the file info. Raises HTTPException if the upload cannot be completed.
+    """
+    async with in_transaction() as connection:
+        # Lock the session row, the expired upload cleanup skips locked sessions
+        session = await ChunkedUploadSession.filter(
+            upload_id=upload_id).select_for_update().using_db(connection).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        
+        # Check if session belongs to current user
+        if session.user_id != user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        expired = session.is_expired()
+        if not expired:
+            # Check if all chunks are received
+            if not session.is_complete():
+                missing_chunks = set(range(session.total_chunks)) - set(session.chunks_received)
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Missing chunks: {sorted(missing_chunks)}"
+                )
+            
+            # Verify the whole upload from the per-chunk digests, without reading the file again
+            upload_checksum = FileService.composite_checksum(session.chunk_checksums, session.total_chunks)
+            if checksum and (upload_checksum is None or checksum.lower() != upload_checksum):
+                raise HTTPException(status_code=400, detail="Checksum mismatch for the uploaded file")
+            
+            # Chunks were written in place, only move the file to its upload path
+            try:
+                final_file_path = await blocking_pool.run(
+                    FileService.finalize_chunked_upload, session.temp_dir, session.filename)
+            except FileNotFoundError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+    
+    if expired:
+        # Clean up expired session
+        await blocking_pool.run(shutil.rmtree, session.temp_dir, ignore_errors=True)
+        await session.delete()
+        raise HTTPException(status_code=410, detail="Upload session has expired")
     
     # Create file info
     file_info = {
@@ -594,30 +1042,31 @@ async def complete_chunked_upload(
         "name": os.path.basename(final_file_path),
         "file_path": final_file_path,
         "file_size": session.file_size,
-        "mime_type": session.mime_type or "application/octet-stream"
+        "mime_type": session.mime_type or "application/octet-stream",
+        "composite_sha256": upload_checksum
     }
     
-    # Analyze file for georeferencing
-    analysis = analyze_raster_file(file_info["file_path"])
-    is_georeferenced = analysis.get("is_georeferenced", False)
+    return session, file_info
+
+
+@router.post("/files/chunked/complete", response_model=FileUploadResponse)
+async def complete_chunked_upload(
+    request: ChunkedUploadCompleteRequest,
+    current_user: Optional[User] = Depends(get_current_user)
+):
+    """Complete the chunked upload and create the file"""
+    ingest_mode = _resolve_ingest_mode(request.ingest_mode)
     
-    # Create file object
-    if is_georeferenced:
-        file_obj = await models_factory.create_geo_file(
-            file_info, session.tags, parent_path=session.parent_path)
-    else:
-        file_obj = await models_factory.create_file(
-            file_info, session.tags, parent_path=session.parent_path)
+    session, file_info = await _finalize_chunked_upload(request.upload_id, current_user, request.checksum)
     
-    file_obj.owner_user_id = current_user.id
-    file_obj.permissions = 0o644
-    await file_obj.save()
+    response = await _register_uploaded_file(
+        file_info, session.tags, session.parent_path, current_user, ingest_mode)
     
     # Clean up temp directory and session
-    shutil.rmtree(session.temp_dir, ignore_errors=True)
+    await blocking_pool.run(shutil.rmtree, session.temp_dir, ignore_errors=True)
     await session.delete()
     
-    return TreeItemResponse.model_validate(file_obj)
+    return response
 
 
 @router.post("/tree-items/{item_id}/probe")
@@ -638,10 +1087,12 @@ async def probe_tree_item(item_id: uuid.UUID, current_user: Optional[User] = Dep
         }
     
     file_obj = await tree_item.get_object()
-    file_path = file_obj.file_path
     
-    # Analyze the raster file
-    analysis = analyze_raster_file(file_path)
+    # Use the raster info stored at ingest time, analyze older files once
+    if file_obj.has_raster_info:
+        analysis = file_obj.get_raster_info()
+    else:
+        analysis = await models_factory.update_raster_info(file_obj)
     
     if not analysis.get("gdal_compatible", False):
         return {
@@ -659,7 +1110,9 @@ async def probe_tree_item(item_id: uuid.UUID, current_user: Optional[User] = Dep
             "height": analysis.get("height"),
             "bands": analysis.get("bands"),
             "has_projection": analysis.get("has_projection", False),
-            "has_geotransform": analysis.get("has_geotransform", False)
+            "has_geotransform": analysis.get("has_geotransform", False),
+            "data_type": analysis.get("data_type"),
+            "epsg_code": analysis.get("epsg_code")
         }
     }
     return result
@@ -738,22 +1191,19 @@ async def download_file(
 @router.get("/files/{file_id}/map")
 async def get_file_map(file_id: uuid.UUID):
     """Get a MapServer URL for a GeoTIFF file"""
-    file_obj = await FileService.get_file(str(file_id))
-    if not file_obj:
+    metadata = await file_metadata_cache.load(str(file_id))
+    if not metadata:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Check if this is a geo raster file
-    if file_obj.object_type != "geo_raster_file":
+    if metadata.object_type != "geo_raster_file":
         raise HTTPException(status_code=400, detail="File type not supported for mapping")
     
-    # Get the actual geo raster file object
-    geo_raster_file = await file_obj.get_object()
-    
     # Use stored config path
-    if not geo_raster_file.map_config_path:
+    if not metadata.map_config_path:
         raise HTTPException(status_code=400, detail="No map configuration available")
     
-    map_url = mapserver_service.get_map_url_from_config(geo_raster_file.map_config_path)
+    map_url = mapserver_service.get_map_url_from_config(metadata.map_config_path)
     if not map_url:
         raise HTTPException(status_code=400, detail="Failed to generate map URL")
     
@@ -770,22 +1220,70 @@ async def _get_tile_session() -> aiohttp.ClientSession:
     return _tile_session
 
 
-@router.get("/files/{file_id}/tiles/{z}/{x}/{y}.png")
-async def get_tile(file_id: uuid.UUID, z: int, x: int, y: int):
-    """Get an XYZ tile for a GeoTIFF file"""
-    file_obj = await FileService.get_file(str(file_id))
-    if not file_obj:
+TILE_HEADERS = {
+    "Cache-Control": "public, max-age=3600",
+}
+
+# Batch tile limits
+MAX_TILES_PER_BATCH = int(os.getenv("MAX_TILES_PER_BATCH", "64"))
+TILE_BATCH_CONCURRENCY = int(os.getenv("TILE_BATCH_CONCURRENCY", "8"))
+
+# Record header of the batch tile stream: z, x, y, payload length (big-endian uint32)
+TILE_BATCH_RECORD = struct.Struct(">IIII")
+
+
+async def _get_tile_source(file_id: uuid.UUID, user: Optional[User]) -> FileMetadata:
+    """Resolve the metadata of the GeoRasterFile that tiles of file_id are rendered from
+    
+    Read permission is checked on the cached permission fields, so a warm cache
+    needs no query.
+    """
+    metadata = await file_metadata_cache.load(str(file_id))
+    if not metadata:
         raise HTTPException(status_code=404, detail="File not found")
 
-    if file_obj.object_type != "geo_raster_file":
+    await require_permission(metadata.permission_item(), user, Permission.READ)
+
+    if metadata.object_type != "geo_raster_file":
         raise HTTPException(status_code=400, detail="File type not supported for tiling")
 
-    geo_raster_file = await file_obj.get_object()
-    if not geo_raster_file.map_config_path:
+    if not _use_gdal_tiles(metadata) and not metadata.map_config_path:
         raise HTTPException(status_code=400, detail="No map configuration available")
 
+    return metadata
+
+
+def _use_gdal_tiles(metadata: FileMetadata) -> bool:
+    return TILE_BACKEND == "gdal" or (TILE_BACKEND == "auto" and metadata.is_cog)
+
+
+async def _get_tile_content(metadata: FileMetadata, z: int, x: int, y: int) -> tuple[bytes, str]:
+    """Get a tile from the cache, or render/fetch it and store it in the cache"""
+    version = tile_cache.file_version(metadata.file_path)
+
+    cached = await tile_cache.get(metadata.object_id, version, z, x, y)
+    if cached is not None:
+        return cached, "image/png"
+
     bbox = mapserver_service.xyz_to_bbox_3857(z, x, y)
-    wms_url = mapserver_service.get_wms_tile_url(geo_raster_file.map_config_path, bbox)
+    if _use_gdal_tiles(metadata):
+        content = await tile_renderer.render(metadata.file_path, bbox)
+        if content is None:
+            raise HTTPException(status_code=502, detail="Tile rendering failed")
+        content_type = "image/png"
+    else:
+        content, content_type = await _fetch_mapserver_tile(metadata.map_config_path, bbox)
+
+    # Only cache real images, MapServer reports some errors as XML with 200 status
+    if content_type.startswith("image/png"):
+        await tile_cache.put(metadata.object_id, version, z, x, y, content)
+
+    return content, content_type
+
+
+async def _fetch_mapserver_tile(map_config_path: str, bbox) -> tuple[bytes, str]:
+    """Fetch a single tile from MapServer via WMS GetMap"""
+    wms_url = mapserver_service.get_wms_tile_url(map_config_path, bbox)
     if not wms_url:
         raise HTTPException(status_code=400, detail="Failed to generate tile URL")
 
@@ -796,11 +1294,82 @@ async def get_tile(file_id: uuid.UUID, z: int, x: int, y: int):
         content = await resp.read()
         content_type = resp.headers.get("Content-Type", "image/png")
 
+    return content, content_type
+
+
+@router.get("/files/{file_id}/tiles/{z}/{x}/{y}.png")
+async def get_tile(
+    file_id: uuid.UUID,
+    z: int,
+    x: int,
+    y: int,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Get an XYZ tile for a GeoTIFF file
+    
+    With a warm metadata cache and a cached tile this does no database queries
+    and never touches the tile backend.
+    """
+    metadata = await _get_tile_source(file_id, current_user)
+    content, content_type = await _get_tile_content(metadata, z, x, y)
+
     return Response(
         content=content,
         media_type=content_type,
+        headers=TILE_HEADERS
+    )
+
+
+@router.post("/files/{file_id}/tiles/batch")
+async def get_tiles_batch(
+    file_id: uuid.UUID,
+    request: TileBatchRequest,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Get many XYZ tiles of one file in a single response
+    
+    The file lookup and permission check are done once for the whole batch and
+    tiles are produced concurrently. The response is a stream of records in
+    completion order, each made of a 16-byte header (z, x, y, payload length as
+    big-endian uint32) followed by the PNG payload. A zero length means the
+    tile could not be produced.
+    """
+    if not request.tiles:
+        raise HTTPException(status_code=422, detail="At least one tile is required")
+    if len(request.tiles) > MAX_TILES_PER_BATCH:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_TILES_PER_BATCH} tiles can be requested at once")
+
+    metadata = await _get_tile_source(file_id, current_user)
+
+    semaphore = asyncio.Semaphore(TILE_BATCH_CONCURRENCY)
+
+    async def produce(tile: TileCoordinate) -> tuple[TileCoordinate, bytes]:
+        async with semaphore:
+            try:
+                content, content_type = await _get_tile_content(metadata, tile.z, tile.x, tile.y)
+            except Exception as e:
+                print(f"Batch tile {tile.z}/{tile.x}/{tile.y} of {file_id} failed: {e}")
+                return tile, b""
+        if not content_type.startswith("image/"):
+            return tile, b""
+        return tile, content
+
+    async def stream():
+        tasks = [asyncio.create_task(produce(tile)) for tile in request.tiles]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                tile, content = await next_done
+                yield TILE_BATCH_RECORD.pack(tile.z, tile.x, tile.y, len(content)) + content
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/octet-stream",
         headers={
-            "Cache-Control": "public, max-age=3600",
+            **TILE_HEADERS,
+            "X-Tile-Count": str(len(request.tiles)),
         }
     )
 
@@ -808,20 +1377,29 @@ async def get_tile(file_id: uuid.UUID, z: int, x: int, y: int):
 @router.get("/files/{file_id}/extent")
 async def get_file_extent(file_id: uuid.UUID):
     """Get the extent (bounding box) of a GeoTIFF file"""
-    file_obj = await FileService.get_file(str(file_id))
-    if not file_obj:
+    metadata = await file_metadata_cache.load(str(file_id))
+    if not metadata:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Use the actual file path (which may be georeferenced version) instead of just the name
-    file_path = await file_obj.get_file_path()
-    if not file_path:
+    if not metadata.file_path:
         raise HTTPException(status_code=400, detail="File path not found")
     
-    extent = mapserver_service.get_file_extent(file_path)
-    if not extent:
+    # Files created before raster info was stored are analyzed once and updated
+    if metadata.extent is None:
+        file_model = models.GeoRasterFile if metadata.object_type == "geo_raster_file" else models.RawFile
+        file_obj = await file_model.get(id=metadata.object_id)
+        if not file_obj.has_raster_info:
+            await models_factory.update_raster_info(file_obj)
+        metadata.extent = file_obj.get_wgs84_extent()
+    if metadata.extent is None:
+        # No projection stored, MapServer treats such files as WGS84
+        metadata.extent, metadata.projection = await blocking_pool.run(
+            mapserver_service.get_file_extent_info, metadata.file_path)
+    if not metadata.extent:
         raise HTTPException(status_code=400, detail="File type not supported for extent calculation")
     
-    return {"extent": extent}
+    return {"extent": metadata.extent}
 
 
 @router.get("/files/{file_id}/preview")
@@ -831,7 +1409,12 @@ async def get_file_preview(file_id: uuid.UUID):
     if not file_obj:
         raise HTTPException(status_code=404, detail="File not found")
     
-    preview_url = mapserver_service.get_preview_url(file_obj.name)
+    # Reuse the stored map config of geo rasters instead of writing a new one per request
+    metadata = await file_metadata_cache.load(str(file_id))
+    map_config_path = metadata.map_config_path if metadata else None
+    
+    preview_url = await blocking_pool.run(
+        mapserver_service.get_preview_url, file_obj.name, map_config_path=map_config_path)
     if not preview_url:
         raise HTTPException(status_code=400, detail="File type not supported for preview")
     
@@ -936,26 +1519,34 @@ async def reset_georeferencing(file_id: uuid.UUID, current_user: Optional[User]
         raise HTTPException(status_code=400, detail="File is already in original state")
 
     # copy original file to file path and generate new uuid name with same extension
-    new_file_path = Path(geo_raster_file.original_file_path).parent / f"{uuid.uuid4()}.tif"
+    output_dir = await blocking_pool.run(FileService.get_derived_file_dir, geo_raster_file.original_file_path)
+    new_file_path = Path(output_dir) / f"{uuid.uuid4()}.tif"
     print(f"Copying original file to {new_file_path}")
-    shutil.copy(geo_raster_file.original_file_path, str(new_file_path))
+    await blocking_pool.run(shutil.copy, geo_raster_file.original_file_path, str(new_file_path))
 
     # regenerate map config to clear cache on mapserver
     old_map_config_path = geo_raster_file.map_config_path
-    map_config_path = mapserver_service._create_map_config(new_file_path)
+    analysis = await blocking_pool.run(analyze_raster_file, str(new_file_path))
+    map_config_path = await blocking_pool.run(
+        mapserver_service._create_map_config, new_file_path, raster_info=analysis)
     geo_raster_file.map_config_path = map_config_path
     geo_raster_file.file_path = new_file_path
     geo_raster_file.is_georeferenced = False  # Mark as not georeferenced
+    geo_raster_file.is_cog = analysis.get("is_cog", False)
+    geo_raster_file.set_raster_info(analysis)
 
     await geo_raster_file.save()
+    await blocking_pool.run(tile_cache.invalidate, geo_raster_file.id)
+    file_metadata_cache.invalidate(str(geo_raster_file.id))
+    await asyncio.to_thread(publish_invalidation, str(geo_raster_file.id))
     
     # Clear the map config since the file is no longer georeferenced
     if old_map_config_path and os.path.exists(old_map_config_path):
-        os.remove(old_map_config_path)
+        await blocking_pool.run(os.remove, old_map_config_path)
     
-    # Remove the previous warped file if it exists
-    if os.path.exists(old_file_path):
-        os.remove(old_file_path)
+    # Remove the previous warped file if it exists, files registered in place are kept
+    if FileService.is_managed_path(old_file_path) and os.path.exists(old_file_path):
+        await blocking_pool.run(os.remove, old_file_path)
     
     return {
         "message": "Georeferencing reset successfully",
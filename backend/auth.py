@@ -2,11 +2,13 @@
 
 from fastapi import HTTPException, Depends, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from typing import Optional, Tuple
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from enum import Enum
 import os
+import time
 import models
 from models import User, TreeItem
 
@@ -17,6 +19,10 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_EXPIRE_DAYS", "7"))
 
+# Authenticated user cache, entries must expire well before the tokens they were loaded for
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1000"))
+USER_CACHE_TTL = min(int(os.getenv("AUTH_USER_CACHE_TTL", "60")), ACCESS_TOKEN_EXPIRE_MINUTES * 60 // 2)
+
 # Security
 security = HTTPBearer()
 
@@ -91,6 +97,53 @@ class AuthService:
             return None
 
 
+class UserCache:
+    """Bounded TTL cache of users and their group IDs, keyed by the token subject (user ID)
+    
+    Avoids loading the user from Postgres on every authenticated request. Entries
+    are dropped explicitly when group membership changes through auth_api; changes
+    made by other processes become visible after the TTL.
+    """
+    
+    def __init__(self, max_entries: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+    
+    async def get_user(self, user_id: str) -> Optional[User]:
+        """Get a user with prefetched group IDs, from the cache or the database"""
+        user_id = str(user_id)
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            user, stored_at = entry
+            if time.monotonic() - stored_at <= self.ttl:
+                self._entries.move_to_end(user_id)
+                return user
+            self._entries.pop(user_id, None)
+        
+        user = await AuthService.get_user_by_id(user_id)
+        if user is None:
+            return None
+        
+        # Prefetch group membership so permission checks don't query it per request
+        await user.get_group_ids()
+        
+        self._entries[user_id] = (user, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return user
+    
+    def invalidate(self, user_id: str):
+        """Drop a cached user, call after changing the user or its group membership"""
+        self._entries.pop(str(user_id), None)
+    
+    def clear(self):
+        self._entries.clear()
+
+
+user_cache = UserCache()
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[User]:
     """
     Get current user from JWT token
@@ -111,8 +164,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if not user_id:
         return None
     
-    # Get user from database
-    user = await AuthService.get_user_by_id(user_id)
+    # Get user from the cache or the database
+    user = await user_cache.get_user(user_id)
     if not user or not user.is_active:
         return None
     
@@ -139,8 +192,8 @@ async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCrede
     if not user_id:
         return None
     
-    # Get user from database
-    user = await AuthService.get_user_by_id(user_id)
+    # Get user from the cache or the database
+    user = await user_cache.get_user(user_id)
     if not user or not user.is_active:
         return None
     
@@ -2,12 +2,14 @@
 
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
+import asyncio
 import uuid
 from pydantic import BaseModel
 
 import models
 from models import User
-from auth import get_current_user, require_admin, AuthService, ACCESS_TOKEN_EXPIRE_MINUTES
+from services.metadata_cache import publish_invalidation
+from auth import get_current_user, require_admin, AuthService, ACCESS_TOKEN_EXPIRE_MINUTES, user_cache
 
 
 router = APIRouter(tags=["authentication"])
@@ -187,6 +189,7 @@ async def add_user_to_group(
         raise HTTPException(status_code=404, detail="User not found")
     
     await group.members.add(user)
+    user_cache.invalidate(user.id)
     return {"message": f"User {user.username} added to group {group.name}"}
 
 
@@ -206,6 +209,7 @@ async def remove_user_from_group(
         raise HTTPException(status_code=404, detail="User not found")
     
     await group.members.remove(user)
+    user_cache.invalidate(user.id)
     return {"message": f"User {user.username} removed from group {group.name}"}
 
 
@@ -228,7 +232,8 @@ async def update_item_permissions(
     if not current_user.is_admin and item.owner_user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only admins or owners can change permissions")
     
-    # Update fields if provided
+    # Update fields if provided, only changed columns are written so child_count stays intact
+    update_fields = ["updated_at"]
     if request.owner_user_id is not None:
         if request.owner_user_id:
             # Verify user exists
@@ -236,6 +241,7 @@ async def update_item_permissions(
             if not new_owner:
                 raise HTTPException(status_code=404, detail="Owner user not found")
         item.owner_user_id = request.owner_user_id
+        update_fields.append("owner_user_id")
     
     if request.owner_group_id is not None:
         if request.owner_group_id:
@@ -244,14 +250,18 @@ async def update_item_permissions(
             if not new_group:
                 raise HTTPException(status_code=404, detail="Owner group not found")
         item.owner_group_id = request.owner_group_id
+        update_fields.append("owner_group_id")
     
     if request.permissions is not None:
         # Validate permissions (should be valid octal, only use read/write bits)
         if request.permissions < 0 or request.permissions > 0o777:
             raise HTTPException(status_code=400, detail="Invalid permissions value")
         item.permissions = request.permissions
+        update_fields.append("permissions")
     
-    await item.save()
+    await item.save(update_fields=update_fields)
+    # Tile endpoints check permissions on the cached metadata of every API process
+    await asyncio.to_thread(publish_invalidation, str(item.id))
     
     return {
         "message": "Permissions updated successfully",
@@ -8,6 +8,9 @@ from kombu import Queue
 # Redis configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+# Seconds between sweeps for expired chunked upload sessions
+UPLOAD_CLEANUP_INTERVAL = int(os.getenv("UPLOAD_CLEANUP_INTERVAL", "3600"))
+
 # Create Celery app
 celery_app = Celery(
     "tagger",
@@ -22,6 +25,7 @@ celery_app.conf.update(
     task_routes={
         "tasks.convert_to_geo_raster_task": {"queue": "geo_processing"},
         "tasks.apply_georeferencing_task": {"queue": "geo_processing"},
+        "tasks.ingest_file_task": {"queue": "geo_processing"},
         "tasks.*": {"queue": "default"},
     },
     
@@ -57,6 +61,14 @@ celery_app.conf.update(
     # Error handling
     task_ignore_result=False,
     task_store_eager_result=True,
+    
+    # Periodic tasks, run with celery beat
+    beat_schedule={
+        "cleanup-expired-uploads": {
+            "task": "tasks.cleanup_expired_uploads",
+            "schedule": UPLOAD_CLEANUP_INTERVAL,
+        },
+    },
 )
 
 # Optional: Configure task result backend for better performance
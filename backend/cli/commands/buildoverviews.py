@@ -0,0 +1,94 @@
+"""
+Build overviews command
+"""
+import os
+from cli.base import BaseCommand
+from models import GeoRasterFile
+from services.files import FileService
+from services.geo import build_overviews, has_overviews, is_cloud_optimized, OVERVIEW_RESAMPLING
+from services.tile_cache import TileCache
+
+
+class BuildOverviewsCommand(BaseCommand):
+    """Backfill internal overviews for existing georeferenced rasters"""
+
+    help = "Build missing overview pyramids for existing GeoRasterFile rows"
+
+    def add_arguments(self):
+        self.parser.add_argument(
+            '--id',
+            action='append',
+            dest='ids',
+            help='Only process the GeoRasterFile with this ID (can be repeated)'
+        )
+        self.parser.add_argument(
+            '--resampling',
+            default=OVERVIEW_RESAMPLING,
+            help=f'GDAL resampling method (default: {OVERVIEW_RESAMPLING})'
+        )
+        self.parser.add_argument(
+            '--levels',
+            help='Comma separated overview factors, e.g. 2,4,8,16 (default: automatic)'
+        )
+        self.parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild overviews even if the file already has them'
+        )
+        self.parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report which files would be processed'
+        )
+
+    async def handle(self, **options):
+        levels = None
+        if options.get('levels'):
+            levels = [int(level) for level in options['levels'].split(',') if level.strip()]
+
+        query = GeoRasterFile.all().order_by('created_at')
+        if options.get('ids'):
+            query = query.filter(id__in=options['ids'])
+
+        tile_cache = TileCache()
+        built = skipped = failed = 0
+
+        for geo_raster_file in await query:
+            file_path = geo_raster_file.file_path
+
+            if not os.path.exists(file_path):
+                print(f"[missing] {geo_raster_file.id}: {file_path}")
+                failed += 1
+                continue
+
+            # Overviews are written into the file, files registered in place or hard-linked
+            # by bulkimport would change the originals
+            if not FileService.can_modify_in_place(file_path):
+                print(f"[not owned] {geo_raster_file.id}: {file_path}")
+                skipped += 1
+                continue
+
+            # COGs always carry internal overviews
+            if is_cloud_optimized(file_path) or (not options['force'] and has_overviews(file_path)):
+                skipped += 1
+                continue
+
+            if options['dry_run']:
+                print(f"[would build] {geo_raster_file.id}: {file_path}")
+                continue
+
+            result = build_overviews(file_path, resampling=options['resampling'], levels=levels)
+            if result:
+                # Low zoom tiles were rendered from full resolution data
+                tile_cache.invalidate(geo_raster_file.id)
+                print(f"[built {result}] {geo_raster_file.id}: {file_path}")
+                built += 1
+            else:
+                print(f"[failed] {geo_raster_file.id}: {file_path}")
+                failed += 1
+
+        print(f"Done. Built: {built}, skipped: {skipped}, failed: {failed}")
+
+
+# Export the command
+command = BuildOverviewsCommand
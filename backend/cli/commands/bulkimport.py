@@ -0,0 +1,293 @@
+"""
+Bulk import command
+"""
+import asyncio
+import json
+import mimetypes
+import multiprocessing
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tortoise import connections
+
+import models_factory
+from cli.base import BaseCommand
+from models import TreeItem, User
+from services.collections import CollectionsService
+from services.files import FileService
+from services.geo import analyze_raster_file
+
+IMPORT_MODES = ("inplace", "link", "copy")
+
+# Set per worker process by _prepare_file
+_mapserver_service = None
+
+
+def _prepare_file(source_path: str, file_path: str, mode: str) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+    """Place one file and analyze it, runs in a worker process
+
+    Returns:
+        (analysis, map_config_path, error), map_config_path is only set for georeferenced files
+    """
+    global _mapserver_service
+    try:
+        if mode != "inplace":
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # A rerun after an interruption finds the files placed before
+            if not os.path.exists(file_path):
+                if mode == "link":
+                    os.link(source_path, file_path)
+                else:
+                    shutil.copy2(source_path, file_path)
+
+        analysis = analyze_raster_file(file_path)
+        map_config_path = None
+        if analysis.get("is_georeferenced", False):
+            if _mapserver_service is None:
+                from mapserver_service import MapServerService
+                _mapserver_service = MapServerService()
+            map_config_path = _mapserver_service._create_map_config(file_path, raster_info=analysis)
+        return analysis, map_config_path, None
+    except Exception as e:
+        return None, None, str(e)
+
+
+class BulkImportCommand(BaseCommand):
+    """Register a local directory tree or a manifest of files as collections and files"""
+
+    help = "Import a directory tree or a manifest of files, mirroring folders as collections"
+
+    def add_arguments(self):
+        self.parser.add_argument(
+            'source',
+            help='Directory to import, or a manifest file with one path per line '
+                 '(optionally followed by a tab and the collection folders, separated by /)'
+        )
+        self.parser.add_argument(
+            '--parent-path',
+            default='root',
+            help='Path of the collection to import into (default: root)'
+        )
+        self.parser.add_argument(
+            '--mode',
+            choices=IMPORT_MODES,
+            default='inplace',
+            help='inplace registers files where they are and never modifies or deletes them, link hard-links '
+                 'and copy copies them into the upload directory (default: inplace)'
+        )
+        self.parser.add_argument(
+            '--extensions',
+            help='Comma separated file extensions to import, e.g. .tif,.pdf (default: all files)'
+        )
+        self.parser.add_argument(
+            '--tags',
+            help='JSON object of tags applied to every imported file'
+        )
+        self.parser.add_argument(
+            '--owner',
+            help='Username that owns the imported collections and files (default: no owner)'
+        )
+        self.parser.add_argument(
+            '--permissions',
+            default='644',
+            help='Octal permissions of the imported collections and files (default: 644)'
+        )
+        self.parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 4,
+            help='Processes used to analyze files (default: number of CPU cores)'
+        )
+        self.parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Files inserted per database transaction (default: 500)'
+        )
+        self.parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report which files would be imported'
+        )
+
+    async def handle(self, **options):
+        source = os.path.abspath(options['source'])
+        if not os.path.exists(source):
+            print(f"Source not found: {source}")
+            return
+
+        parent_collection = await CollectionsService.get_collection_by_path(options['parent_path'])
+        if not parent_collection:
+            print(f"Collection not found: {options['parent_path']}")
+            return
+
+        self.owner_id = None
+        if options.get('owner'):
+            owner = await User.get_or_none(username=options['owner'])
+            if not owner:
+                print(f"User not found: {options['owner']}")
+                return
+            self.owner_id = owner.id
+
+        self.mode = options['mode']
+        self.permissions = int(options['permissions'], 8)
+        self.tags = json.loads(options['tags']) if options.get('tags') else {}
+        extensions = None
+        if options.get('extensions'):
+            extensions = {ext.strip().lower() for ext in options['extensions'].split(',') if ext.strip()}
+
+        # Collection ltree path per relative folder, the import target is the empty folder
+        self.collection_paths = {"": parent_collection.path}
+
+        if os.path.isdir(source):
+            entries = self._walk_directory(source, extensions)
+        else:
+            entries = self._read_manifest(source, extensions)
+
+        # Files registered before are skipped, so an interrupted import can be rerun
+        existing = await self._get_registered_paths()
+        self.imported = self.skipped = self.failed = 0
+
+        if options['dry_run']:
+            for source_path, folder in entries:
+                if self._get_file_path(source_path) in existing:
+                    self.skipped += 1
+                    continue
+                print(f"[would import] {source_path} -> {folder or '.'}")
+                self.imported += 1
+            print(f"Done. Would import: {self.imported}, already registered: {self.skipped}")
+            return
+
+        loop = asyncio.get_running_loop()
+        # Spawned workers do not inherit the database connections of this process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            pending = None
+            async for batch in self._batches(entries, existing, options['batch_size']):
+                # Analyze the next batch while the previous one is written to the database
+                futures = [
+                    loop.run_in_executor(pool, _prepare_file, source_path, file_path, self.mode)
+                    for source_path, file_path, _ in batch
+                ]
+                if pending:
+                    await self._insert_batch(*pending)
+                pending = (batch, futures)
+            if pending:
+                await self._insert_batch(*pending)
+
+        print(f"Done. Imported: {self.imported}, already registered: {self.skipped}, failed: {self.failed}")
+
+    def _walk_directory(self, source: str, extensions: Optional[set]) -> Iterator[Tuple[str, str]]:
+        """Yield (file path, folder relative to the source) for every file below source"""
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            folder = os.path.relpath(dirpath, source)
+            folder = "" if folder == "." else folder.replace(os.sep, "/")
+            for filename in sorted(filenames):
+                if extensions and os.path.splitext(filename)[1].lower() not in extensions:
+                    continue
+                yield os.path.join(dirpath, filename), folder
+
+    def _read_manifest(self, manifest: str, extensions: Optional[set]) -> Iterator[Tuple[str, str]]:
+        """Yield (file path, collection folders) for every line of a manifest"""
+        base_dir = os.path.dirname(manifest)
+        with open(manifest) as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if not line.strip() or line.startswith("#"):
+                    continue
+                source_path, _, folder = line.partition("\t")
+                source_path = os.path.join(base_dir, source_path.strip())
+                if extensions and os.path.splitext(source_path)[1].lower() not in extensions:
+                    continue
+                yield os.path.abspath(source_path), folder.strip().strip("/")
+
+    def _get_file_path(self, source_path: str) -> str:
+        """Path the file is registered with, placed files get a stable name so reruns find them"""
+        if self.mode == "inplace":
+            return source_path
+        file_id = uuid.uuid5(uuid.NAMESPACE_URL, source_path).hex
+        extension = os.path.splitext(source_path)[1]
+        return os.path.join(FileService.UPLOAD_DIR, "bulk", file_id[:2], f"{file_id}{extension}")
+
+    async def _get_registered_paths(self) -> set:
+        rows = await connections.get("default").execute_query_dict(
+            "SELECT file_path FROM raw_files UNION ALL SELECT file_path FROM geo_raster_files"
+        )
+        return {row["file_path"] for row in rows}
+
+    async def _batches(self, entries, existing: set, batch_size: int):
+        """Group new files into batches of (source path, file path, collection path)"""
+        batch = []
+        for source_path, folder in entries:
+            file_path = self._get_file_path(source_path)
+            if file_path in existing:
+                self.skipped += 1
+                continue
+            existing.add(file_path)
+            collection_path = await self._get_collection_path(folder)
+            batch.append((source_path, file_path, collection_path))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def _get_collection_path(self, folder: str) -> str:
+        """Get or create the collection mirroring a folder, parents first"""
+        if folder in self.collection_paths:
+            return self.collection_paths[folder]
+
+        parent_folder, _, name = folder.rpartition("/")
+        parent_path = await self._get_collection_path(parent_folder)
+
+        collection = await TreeItem.get_or_none(parent_path=parent_path, name=name, object_type="collection")
+        if not collection:
+            collection = await CollectionsService.create_collection(name, {}, parent_path=parent_path)
+            collection.owner_user_id = self.owner_id
+            collection.permissions = self.permissions
+            await collection.save(update_fields=["owner_user_id", "permissions"])
+            print(f"[collection] {folder}")
+
+        self.collection_paths[folder] = str(collection.path)
+        return self.collection_paths[folder]
+
+    async def _insert_batch(self, batch: List[Tuple[str, str, str]], futures: List[asyncio.Future]):
+        """Create the records of one analyzed batch in a single transaction"""
+        results = await asyncio.gather(*futures)
+
+        files = []
+        for (source_path, file_path, collection_path), (analysis, map_config_path, error) in zip(batch, results):
+            if error:
+                print(f"[failed] {source_path}: {error}")
+                self.failed += 1
+                continue
+
+            original_name = os.path.basename(source_path)
+            files.append({
+                "original_name": original_name,
+                "name": original_name,
+                "file_path": file_path,
+                "file_size": os.path.getsize(file_path),
+                "mime_type": mimetypes.guess_type(original_name)[0] or "application/octet-stream",
+                "analysis": analysis,
+                "object_type": "geo_raster_file" if map_config_path else "raw_file",
+                "map_config_path": map_config_path,
+                "parent_path": collection_path,
+            })
+            if self.mode == "inplace":
+                # Marks the file as the original, georeferencing keeps it and writes its output elsewhere
+                files[-1]["original_file_path"] = source_path
+
+        tree_items = await models_factory.create_files_bulk(
+            files, tags=self.tags, owner_user_id=self.owner_id, permissions=self.permissions)
+
+        self.imported += len(tree_items)
+        print(f"[imported] {self.imported} files ({self.skipped} already registered, {self.failed} failed)")
+
+
+# Export the command
+command = BulkImportCommand
@@ -1,11 +1,14 @@
 import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from tortoise.contrib.fastapi import register_tortoise
 
 from database import TORTOISE_ORM
-from api import router as api_router
+from api import router as api_router, file_metadata_cache
 from auth_api import router as auth_router
+from services.metadata_cache import listen_for_invalidations
+from services.executor import blocking_pool
 
 app = FastAPI(
     title="File Tagger API",
@@ -31,6 +34,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_metadata_invalidation_listener():
+    app.state.metadata_listener = asyncio.create_task(listen_for_invalidations(file_metadata_cache))
+
+
+@app.on_event("shutdown")
+async def stop_metadata_invalidation_listener():
+    app.state.metadata_listener.cancel()
+
+
+@app.on_event("shutdown")
+def stop_blocking_pool():
+    blocking_pool.shutdown()
+
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 app.include_router(auth_router, prefix="/api/v1")
@@ -48,4 +66,4 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy", "blocking_pool": blocking_pool.stats()} 
\ No newline at end of file
@@ -152,16 +152,49 @@ class MapServerService:
             print(f"Error extracting GDAL info from {filepath}: {e}")
             return None, None
     
-    def _create_map_config(self, filepath):
+    def _get_raster_info_extent(self, raster_info):
+        """
+        Get extent and projection string from a stored analyze_raster_file result, without opening the file
+        """
+        geotransform = raster_info.get("geotransform")
+        width = raster_info.get("width")
+        height = raster_info.get("height")
+        if not geotransform or width is None or height is None:
+            return None, None
+        
+        ulx = geotransform[0]
+        uly = geotransform[3]
+        lrx = geotransform[0] + geotransform[1] * width
+        lry = geotransform[3] + geotransform[5] * height
+        extent = (ulx, lry, lrx, uly)  # (min_x, min_y, max_x, max_y)
+        
+        if raster_info.get("epsg_code"):
+            projection_str = f'"init=epsg:{raster_info["epsg_code"]}"'
+        elif raster_info.get("projection_wkt"):
+            projection_str = f'"{raster_info["projection_wkt"]}"'
+        else:
+            # Default to WGS84 if no projection found
+            projection_str = '"init=epsg:4326"'
+        
+        return extent, projection_str
+    
+    def _create_map_config(self, filepath, raster_info=None):
         """
         Create a MapServer configuration file for a specific GeoTIFF in the shared directory
+        
+        If raster_info (an analyze_raster_file result) is given, extent and projection are
+        taken from it instead of opening the file with GDAL again.
         """
         # Generate a unique config filepath
         config_filename = f"map_{uuid.uuid4().hex[:8]}_{Path(filepath).stem}.map"
         config_path = self.shared_mapserver_dir / config_filename
         
-        # Get extent and projection from the file using GDAL
-        extent, projection = self._get_gdal_info(filepath)
+        extent, projection = None, None
+        if raster_info and raster_info.get("gdal_compatible"):
+            extent, projection = self._get_raster_info_extent(raster_info)
+        if not extent:
+            # Get extent and projection from the file using GDAL
+            extent, projection = self._get_gdal_info(filepath)
         
         # Use extracted values or fallback to defaults
         if extent:
@@ -223,16 +256,19 @@ END"""
         print(f"Created MapServer config: {config_path}")
         return str(config_path)
     
-    def get_preview_url(self, filename):
+    def get_preview_url(self, filename, map_config_path=None):
         """
         Get a simple preview URL for a GeoTIFF file
+        
+        An existing map config is reused if given, otherwise a new one is created.
         """
         # Support both regular files and temp files
         if not self._is_geotiff(filename) and not filename.endswith(('.tif', '.tiff', '.pdf')):
             return None
             
-        # Create a MapServer configuration for this specific file
-        map_config_path = self._create_map_config(filename)
+        if not map_config_path:
+            # Create a MapServer configuration for this specific file
+            map_config_path = self._create_map_config(filename)
         
         return f"{self.mapserver_url}/mapserver?map={map_config_path}&layer=geotiff_layer&mode=map"
     
@@ -240,8 +276,17 @@ END"""
         """
         Get the extent (bounding box) of a GeoTIFF file in WGS84 coordinates
         """
+        extent, _ = self.get_file_extent_info(filename)
+        return extent
+    
+    def get_file_extent_info(self, filename):
+        """
+        Get the WGS84 extent string and the MapServer projection string of a GeoTIFF file
+        
+        Returns (None, None) if the file is not supported or has no extent.
+        """
         if not self._is_geotiff(filename):
-            return None
+            return None, None
             
         # Get extent and projection from GDAL
         extent, projection_str = self._get_gdal_info(filename)
@@ -259,9 +304,9 @@ END"""
                 # Return extent as a comma-separated string in WGS84
                 result = f"{wgs84_extent[0]},{wgs84_extent[1]},{wgs84_extent[2]},{wgs84_extent[3]}"
                 print(f"Returning extent: {result}")
-                return result
+                return result, projection_str
         
-        return None
+        return None, None
     
     def _transform_extent_to_wgs84(self, extent, projection_str):
         """
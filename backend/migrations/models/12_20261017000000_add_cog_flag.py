@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Track whether the current file is a Cloud-Optimized GeoTIFF
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "is_cog" BOOLEAN NOT NULL DEFAULT FALSE;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "is_cog";
+    """
@@ -0,0 +1,60 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Raster properties captured at ingest time so requests don't reopen files with GDAL
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "width" INT;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "height" INT;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "band_count" INT;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "data_type" VARCHAR(32);
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "geotransform" JSONB;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "projection_wkt" TEXT;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "epsg_code" INT;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "wgs84_min_x" DOUBLE PRECISION;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "wgs84_min_y" DOUBLE PRECISION;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "wgs84_max_x" DOUBLE PRECISION;
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "wgs84_max_y" DOUBLE PRECISION;
+
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "width" INT;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "height" INT;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "band_count" INT;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "data_type" VARCHAR(32);
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "geotransform" JSONB;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "projection_wkt" TEXT;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "epsg_code" INT;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "wgs84_min_x" DOUBLE PRECISION;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "wgs84_min_y" DOUBLE PRECISION;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "wgs84_max_x" DOUBLE PRECISION;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "wgs84_max_y" DOUBLE PRECISION;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "width";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "height";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "band_count";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "data_type";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "geotransform";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "projection_wkt";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "epsg_code";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "wgs84_min_x";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "wgs84_min_y";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "wgs84_max_x";
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "wgs84_max_y";
+
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "width";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "height";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "band_count";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "data_type";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "geotransform";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "projection_wkt";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "epsg_code";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "wgs84_min_x";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "wgs84_min_y";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "wgs84_max_x";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "wgs84_max_y";
+    """
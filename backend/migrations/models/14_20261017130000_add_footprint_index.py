@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Bounding-box search over geo raster footprints, see CollectionsService.search_items
+        CREATE INDEX IF NOT EXISTS "idx_geo_raster_files_footprint" ON "geo_raster_files"
+            USING GIST (box(point("wgs84_min_x", "wgs84_min_y"), point("wgs84_max_x", "wgs84_max_y")))
+            WHERE "wgs84_min_x" IS NOT NULL;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_geo_raster_files_footprint";
+    """
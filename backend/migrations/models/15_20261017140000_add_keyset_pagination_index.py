@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Keyset pagination orders by (created_at, id), the index serves both directions
+        CREATE INDEX IF NOT EXISTS "idx_tree_items_created_at_id" ON "tree_items" ("created_at", "id");
+        DROP INDEX IF EXISTS "idx_tree_items_created_at";
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_tree_items_created_at" ON "tree_items" ("created_at");
+        DROP INDEX IF EXISTS "idx_tree_items_created_at_id";
+    """
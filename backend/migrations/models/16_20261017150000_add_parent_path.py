@@ -0,0 +1,23 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Denormalized parent path so listing a collection is an index range scan
+        ALTER TABLE "tree_items" ADD COLUMN IF NOT EXISTS "parent_path" LTREE;
+        UPDATE "tree_items" SET "parent_path" = subpath("path", 0, nlevel("path") - 1) WHERE nlevel("path") > 1;
+        CREATE INDEX IF NOT EXISTS "idx_tree_items_parent_path" ON "tree_items" ("parent_path", "created_at", "id");
+
+        -- Subtree queries (<@, @>) on path
+        CREATE INDEX IF NOT EXISTS "idx_tree_items_path_gist" ON "tree_items" USING GIST ("path");
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_tree_items_path_gist";
+        DROP INDEX IF EXISTS "idx_tree_items_parent_path";
+        ALTER TABLE "tree_items" DROP COLUMN IF EXISTS "parent_path";
+    """
@@ -0,0 +1,23 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Per-collection counter of direct children, maintained on create, move and delete
+        ALTER TABLE "tree_items" ADD COLUMN IF NOT EXISTS "child_count" INT NOT NULL DEFAULT 0;
+        UPDATE "tree_items" AS t SET "child_count" = c."count"
+        FROM (
+            SELECT "parent_path", COUNT(*) AS "count" FROM "tree_items"
+            WHERE "parent_path" IS NOT NULL
+            GROUP BY "parent_path"
+        ) AS c
+        WHERE t."path" = c."parent_path";
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "tree_items" DROP COLUMN IF EXISTS "child_count";
+    """
@@ -0,0 +1,22 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Support the read-permission condition of listing and search
+        CREATE INDEX IF NOT EXISTS "idx_tree_items_owner_user_id" ON "tree_items" ("owner_user_id");
+        CREATE INDEX IF NOT EXISTS "idx_tree_items_owner_group_id" ON "tree_items" ("owner_group_id");
+        -- Anonymous listings only see world-readable items (0o004)
+        CREATE INDEX IF NOT EXISTS "idx_tree_items_public_parent_path" ON "tree_items" ("parent_path", "created_at", "id")
+            WHERE ("permissions" & 4) <> 0;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_tree_items_public_parent_path";
+        DROP INDEX IF EXISTS "idx_tree_items_owner_group_id";
+        DROP INDEX IF EXISTS "idx_tree_items_owner_user_id";
+    """
@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- sha256 of every received chunk, keyed by chunk number
+        ALTER TABLE "chunked_upload_sessions" ADD COLUMN IF NOT EXISTS "chunk_checksums" JSONB NOT NULL DEFAULT '{}';
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "chunked_upload_sessions" DROP COLUMN IF EXISTS "chunk_checksums";
+    """
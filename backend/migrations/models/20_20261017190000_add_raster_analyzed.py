@@ -0,0 +1,20 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Set once a file was analyzed, also if GDAL could not open it
+        ALTER TABLE "raw_files" ADD COLUMN IF NOT EXISTS "raster_analyzed" BOOLEAN NOT NULL DEFAULT FALSE;
+        ALTER TABLE "geo_raster_files" ADD COLUMN IF NOT EXISTS "raster_analyzed" BOOLEAN NOT NULL DEFAULT FALSE;
+        UPDATE "raw_files" SET "raster_analyzed" = TRUE WHERE "width" IS NOT NULL;
+        UPDATE "geo_raster_files" SET "raster_analyzed" = TRUE WHERE "width" IS NOT NULL;
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "raw_files" DROP COLUMN IF EXISTS "raster_analyzed";
+        ALTER TABLE "geo_raster_files" DROP COLUMN IF EXISTS "raster_analyzed";
+    """
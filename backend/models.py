@@ -1,11 +1,13 @@
 from tortoise import fields, models
 from tortoise.contrib.pydantic import pydantic_model_creator
 import hashlib
+import json
 import secrets
 import os
+import uuid
 
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, List, Optional, Set, Union
 
 
 class LTreeField(fields.Field):
@@ -39,6 +41,18 @@ class User(models.Model):
     def check_password(self, password: str) -> bool:
         """Verify password against stored hash"""
         return self.password_hash == hashlib.sha512((password + self.salt).encode()).hexdigest()
+    
+    async def get_group_ids(self) -> Set[uuid.UUID]:
+        """IDs of the groups this user belongs to
+        
+        Loaded with one query and memoized on the instance, so every permission
+        check during a request shares it.
+        """
+        group_ids = getattr(self, "_group_ids", None)
+        if group_ids is None:
+            group_ids = set(await self.groups.all().values_list("id", flat=True))
+            self._group_ids = group_ids
+        return group_ids
 
 
 class Group(models.Model):
@@ -58,7 +72,110 @@ class Group(models.Model):
     def __str__(self):
         return f"Group(id={self.id}, name='{self.name}')"
 
-class RawFile(models.Model):
+# Raster properties that never change for a given file, see RasterInfoMixin
+RASTER_INFO_FIELDS = [
+    "width", "height", "band_count", "data_type", "geotransform", "projection_wkt", "epsg_code",
+    "wgs84_min_x", "wgs84_min_y", "wgs84_max_x", "wgs84_max_y", "raster_analyzed",
+]
+
+# GDAL's default geotransform for rasters without georeferencing
+IDENTITY_GEOTRANSFORM = [0.0, 1.0, 0.0, 0.0, 0.0, 1.0]
+
+
+class RasterInfoMixin:
+    """Raster properties captured by analyze_raster_file when a file is ingested or warped
+    
+    All columns are null for files that are not GDAL compatible or were created
+    before these columns existed. raster_analyzed tells the two apart, so files
+    GDAL cannot open are analyzed only once.
+    """
+    raster_analyzed = fields.BooleanField(default=False)
+    width = fields.IntField(null=True)
+    height = fields.IntField(null=True)
+    band_count = fields.IntField(null=True)
+    data_type = fields.CharField(max_length=32, null=True)  # GDAL data type name, e.g. "Byte"
+    geotransform = fields.JSONField(null=True)  # GDAL 6-element geotransform
+    projection_wkt = fields.TextField(null=True)
+    epsg_code = fields.IntField(null=True)
+    # Bounding box in WGS84 lon/lat
+    wgs84_min_x = fields.FloatField(null=True)
+    wgs84_min_y = fields.FloatField(null=True)
+    wgs84_max_x = fields.FloatField(null=True)
+    wgs84_max_y = fields.FloatField(null=True)
+
+    @staticmethod
+    def raster_info_fields(analysis: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Map an analyze_raster_file result to column values"""
+        if not analysis:
+            return {}
+        if not analysis.get("gdal_compatible"):
+            return {"raster_analyzed": True}
+        bounds = analysis.get("wgs84_bounds") or [None, None, None, None]
+        return {
+            "raster_analyzed": True,
+            "width": analysis.get("width"),
+            "height": analysis.get("height"),
+            "band_count": analysis.get("bands"),
+            "data_type": analysis.get("data_type"),
+            "geotransform": analysis.get("geotransform"),
+            "projection_wkt": analysis.get("projection_wkt"),
+            "epsg_code": analysis.get("epsg_code"),
+            "wgs84_min_x": bounds[0],
+            "wgs84_min_y": bounds[1],
+            "wgs84_max_x": bounds[2],
+            "wgs84_max_y": bounds[3],
+        }
+
+    def set_raster_info(self, analysis: Optional[Dict[str, Any]]):
+        """Store an analyze_raster_file result (does not save)"""
+        for field_name in RASTER_INFO_FIELDS:
+            setattr(self, field_name, None)
+        self.raster_analyzed = False
+        for field_name, value in self.raster_info_fields(analysis).items():
+            setattr(self, field_name, value)
+
+    @property
+    def has_raster_info(self) -> bool:
+        """Whether the file was analyzed, also if GDAL could not open it"""
+        return self.raster_analyzed
+
+    def get_raster_info(self) -> Dict[str, Any]:
+        """Stored raster info in the same shape as analyze_raster_file returns"""
+        if self.width is None:
+            return {
+                "gdal_compatible": False,
+                "is_georeferenced": False,
+                "error": "File cannot be opened by GDAL",
+            }
+        has_projection = bool(self.projection_wkt and self.projection_wkt.strip())
+        has_geotransform = bool(self.geotransform and list(self.geotransform) != IDENTITY_GEOTRANSFORM)
+        wgs84_bounds = None
+        if self.wgs84_min_x is not None:
+            wgs84_bounds = [self.wgs84_min_x, self.wgs84_min_y, self.wgs84_max_x, self.wgs84_max_y]
+        return {
+            "gdal_compatible": True,
+            "is_georeferenced": has_projection and has_geotransform,
+            "width": self.width,
+            "height": self.height,
+            "bands": self.band_count,
+            "has_projection": has_projection,
+            "has_geotransform": has_geotransform,
+            "data_type": self.data_type,
+            "geotransform": self.geotransform,
+            "projection_wkt": self.projection_wkt,
+            "epsg_code": self.epsg_code,
+            "wgs84_bounds": wgs84_bounds,
+            "is_cog": getattr(self, "is_cog", False),
+        }
+
+    def get_wgs84_extent(self) -> Optional[str]:
+        """WGS84 extent as "min_x,min_y,max_x,max_y", or None if unknown"""
+        if self.wgs84_min_x is None:
+            return None
+        return f"{self.wgs84_min_x},{self.wgs84_min_y},{self.wgs84_max_x},{self.wgs84_max_y}"
+
+
+class RawFile(RasterInfoMixin, models.Model):
     """Model for raw files (documents, non-geospatial images, etc.)
     
     Note: Metadata like sha1 is stored in TreeItem.tags
@@ -82,7 +199,7 @@ class RawFile(models.Model):
         return self.file_path
 
 
-class GeoRasterFile(models.Model):
+class GeoRasterFile(RasterInfoMixin, models.Model):
     """Model for georeferenced raster files (GeoTIFF, georeferenced images)
     """
     id = fields.UUIDField(pk=True)
@@ -91,6 +208,7 @@ class GeoRasterFile(models.Model):
     original_file_path = fields.CharField(max_length=1000, null=True)  # Original before georeferencing
     map_config_path = fields.CharField(max_length=1000, null=True)  # MapServer config file path
     is_georeferenced = fields.BooleanField(default=False)  # Whether the file has been properly georeferenced
+    is_cog = fields.BooleanField(default=False)  # Whether file_path is a Cloud-Optimized GeoTIFF
     file_size = fields.BigIntField()
     mime_type = fields.CharField(max_length=200)
     created_at = fields.DatetimeField(auto_now_add=True)
@@ -140,6 +258,10 @@ class TreeItem(models.Model):
     
     # Hierarchical path using LTREE
     path = LTreeField(default="root")
+    # Path of the containing collection (path without its last label), null for the root
+    parent_path = LTreeField(null=True)
+    # Number of direct children, maintained by CollectionsService.adjust_child_count
+    child_count = fields.IntField(default=0)
     
     # Linux-style permissions
     owner_user = fields.ForeignKeyField('models.User', related_name='owned_items', null=True)
@@ -151,6 +273,7 @@ class TreeItem(models.Model):
 
     class Meta:
         table = "tree_items"
+        # idx_tree_items_parent_path and the other listing indexes are created by hand written migrations
         indexes = [
             ("object_type", "object_id"),
         ]
@@ -197,49 +320,45 @@ class TreeItem(models.Model):
         return ""
     
     # Permission checking methods
-    async def can_read(self, user: Optional['User'] = None) -> bool:
-        """Check if user has read permission on this item"""
+    def check_permission(self, user: Optional['User'], group_ids: Set[uuid.UUID], owner_bit: int, group_bit: int, other_bit: int) -> bool:
+        """Check one permission with the user's group IDs already resolved
+        
+        Owner, group and other bits are checked in that order, the first class the
+        user belongs to decides (like Linux file permissions).
+        """
         if user is None:
             # No user provided, check "other" permissions (last 3 bits)
-            return bool(self.permissions & 0o004)
+            return bool(self.permissions & other_bit)
         
         if user.is_admin:
             return True
         
         # Check owner permissions (first 3 bits)
         if self.owner_user_id == user.id:
-            return bool(self.permissions & 0o400)
+            return bool(self.permissions & owner_bit)
         
         # Check group permissions (middle 3 bits)
-        if self.owner_group_id:
-            user_groups = await user.groups.all()
-            if any(group.id == self.owner_group_id for group in user_groups):
-                return bool(self.permissions & 0o040)
+        if self.owner_group_id and self.owner_group_id in group_ids:
+            return bool(self.permissions & group_bit)
         
         # Check other permissions (last 3 bits)
-        return bool(self.permissions & 0o004)
+        return bool(self.permissions & other_bit)
+    
+    async def _get_group_ids_for_check(self, user: Optional['User']) -> Set[uuid.UUID]:
+        # Group membership only matters for non-owners of group-owned items
+        if user is None or user.is_admin or not self.owner_group_id or self.owner_user_id == user.id:
+            return set()
+        return await user.get_group_ids()
+    
+    async def can_read(self, user: Optional['User'] = None) -> bool:
+        """Check if user has read permission on this item"""
+        group_ids = await self._get_group_ids_for_check(user)
+        return self.check_permission(user, group_ids, 0o400, 0o040, 0o004)
     
     async def can_write(self, user: Optional['User'] = None) -> bool:
         """Check if user has write permission on this item"""
-        if user is None:
-            # No user provided, check "other" permissions
-            return bool(self.permissions & 0o002)
-        
-        if user.is_admin:
-            return True
-        
-        # Check owner permissions
-        if self.owner_user_id == user.id:
-            return bool(self.permissions & 0o200)
-        
-        # Check group permissions
-        if self.owner_group_id:
-            user_groups = await user.groups.all()
-            if any(group.id == self.owner_group_id for group in user_groups):
-                return bool(self.permissions & 0o020)
-        
-        # Check other permissions
-        return bool(self.permissions & 0o002)
+        group_ids = await self._get_group_ids_for_check(user)
+        return self.check_permission(user, group_ids, 0o200, 0o020, 0o002)
     
     def get_permission_string(self) -> str:
         """Get human-readable permission string like 'rw-rw-r--'"""
@@ -277,6 +396,7 @@ class ChunkedUploadSession(models.Model):
     chunk_size = fields.BigIntField()
     total_chunks = fields.IntField()
     chunks_received = fields.JSONField(default=list)  # List of chunk numbers received
+    chunk_checksums = fields.JSONField(default=dict)  # Chunk number (as string) -> sha256 hex of its data
     temp_dir = fields.CharField(max_length=500)  # Path to temporary directory
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
@@ -302,6 +422,84 @@ class ChunkedUploadSession(models.Model):
         if chunk_number not in self.chunks_received:
             self.chunks_received.append(chunk_number)
             self.chunks_received.sort()  # Keep sorted for easier debugging
+    
+    async def record_chunk(self, chunk_number: int, checksum: str) -> int:
+        """Atomically mark a chunk as received in the database and store its sha256
+        
+        Unlike add_chunk + save, concurrent uploads of different chunks of the same
+        session cannot overwrite each other's bookkeeping. Refreshes chunks_received
+        and chunk_checksums and returns the number of chunks received so far.
+        """
+        from tortoise import connections
+        connection = connections.get("default")
+        
+        # Append the chunk number only if missing, a re-uploaded chunk replaces its checksum.
+        # The row lock serializes concurrent updates.
+        rows = await connection.execute_query_dict(
+            """
+            UPDATE chunked_upload_sessions
+            SET chunks_received = CASE
+                    WHEN chunks_received @> jsonb_build_array($2::int) THEN chunks_received
+                    ELSE chunks_received || jsonb_build_array($2::int)
+                END,
+                chunk_checksums = chunk_checksums || jsonb_build_object($2::text, $3::text),
+                updated_at = NOW()
+            WHERE id = $1
+            RETURNING chunks_received, chunk_checksums
+            """,
+            [self.id, chunk_number, checksum]
+        )
+        if rows:
+            chunks_received = rows[0]["chunks_received"]
+            chunk_checksums = rows[0]["chunk_checksums"]
+            self.chunks_received = sorted(json.loads(chunks_received) if isinstance(chunks_received, str) else chunks_received)
+            self.chunk_checksums = json.loads(chunk_checksums) if isinstance(chunk_checksums, str) else chunk_checksums
+        return len(self.chunks_received)
+    
+    async def discard_chunk(self, chunk_number: int) -> int:
+        """Atomically mark a chunk as not received and drop its sha256
+        
+        Called before a recorded chunk is written again, so the upload cannot be
+        completed with the stale checksum while the new data is being validated.
+        Returns the number of chunks still received.
+        """
+        from tortoise import connections
+        connection = connections.get("default")
+        
+        rows = await connection.execute_query_dict(
+            """
+            UPDATE chunked_upload_sessions
+            SET chunks_received = (
+                    SELECT COALESCE(jsonb_agg(received), '[]'::jsonb)
+                    FROM jsonb_array_elements(chunks_received) AS received
+                    WHERE received <> to_jsonb($2::int)
+                ),
+                chunk_checksums = chunk_checksums - $2::text,
+                updated_at = NOW()
+            WHERE id = $1
+            RETURNING chunks_received, chunk_checksums
+            """,
+            [self.id, chunk_number]
+        )
+        if rows:
+            chunks_received = rows[0]["chunks_received"]
+            chunk_checksums = rows[0]["chunk_checksums"]
+            self.chunks_received = sorted(json.loads(chunks_received) if isinstance(chunks_received, str) else chunks_received)
+            self.chunk_checksums = json.loads(chunk_checksums) if isinstance(chunk_checksums, str) else chunk_checksums
+        return len(self.chunks_received)
+    
+    def get_missing_ranges(self) -> List[List[int]]:
+        """Chunks not received yet, as inclusive [first, last] chunk number ranges"""
+        received = set(self.chunks_received)
+        ranges = []
+        for chunk_number in range(self.total_chunks):
+            if chunk_number in received:
+                continue
+            if ranges and ranges[-1][1] == chunk_number - 1:
+                ranges[-1][1] = chunk_number
+            else:
+                ranges.append([chunk_number, chunk_number])
+        return ranges
 
 
 class TaskRecord(models.Model):
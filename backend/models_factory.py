@@ -1,102 +1,224 @@
 
 import uuid
 import os
+from collections import Counter
 from pathlib import Path
-from typing import Dict
-from models import TreeItem, RawFile, GeoRasterFile
+from typing import Any, Dict, List, Optional, Union
+from models import TreeItem, RawFile, GeoRasterFile, RASTER_INFO_FIELDS
 from mapserver_service import MapServerService
-from services.geo import analyze_raster_file, create_dummy_georeferenced_file
+from services.geo import analyze_raster_file, create_dummy_georeferenced_file, build_overviews
 from fastapi import HTTPException
+from tortoise.transactions import in_transaction
+from services.collections import CollectionsService
+from services.files import FileService
+from services.executor import blocking_pool
 
 
 mapserver_service = MapServerService()
 
-async def create_file(file_info: Dict[str, str], tags: Dict[str, str] = None, parent_path: str = "root") -> TreeItem:
-    """Create a new raw file record in the database.
+def _remove_files(file_paths: List[str]):
+    """Delete files, ignoring those already gone"""
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+async def create_files_bulk(files: List[Dict[str, Any]], tags: Dict[str, Any] = None, parent_path: str = "root",
+                            owner_user_id: Optional[uuid.UUID] = None, permissions: Optional[int] = None) -> List[TreeItem]:
+    """Create records for many files with multi-row INSERTs in a single transaction.
     
     Args:
-        file_info: Dictionary containing file information (original_name, file_path, file_size, mime_type, name)
-        tags: Optional dictionary of tags to apply
+        files: file_info dictionaries (original_name, file_path, file_size, mime_type, name), each may also have:
+            sha1: Stored in the tags of the tree item
+            composite_sha256: Checksum of a chunked upload (sha256 of its chunk digests), stored in the tags
+            analysis: analyze_raster_file result to persist with the file
+            object_type: "raw_file" or "geo_raster_file", by default georeferenced files become geo raster files
+            map_config_path: MapServer config of a geo raster file, created if missing
+            original_file_path: Original of a geo raster file, kept when it is georeferenced again
+            parent_path, tags: Override the arguments of the same name for this file
+        tags: Tags applied to files without their own
         parent_path: Parent path in the tree structure (default: "root")
+        owner_user_id: Owner of the created tree items
+        permissions: Permissions of the created tree items, the model default if not given
         
     Returns:
-        TreeItem: The created tree item representing the file
+        List[TreeItem]: The created tree items, in the order of files
     """
+    raw_files, geo_raster_files, tree_items = [], [], []
+    child_counts = Counter()
+    # MapServer configs of this batch, nothing points at them if the records are not created
+    map_config_paths = []
     
-    # Create LTREE-compatible ID: use 'f' prefix + first 12 chars of UUID hex (no hyphens)
-    file_uuid = str(uuid.uuid4()).replace('-', '')[:12]
-    file_segment = f"f{file_uuid}"
+    try:
+        for file_info in files:
+            analysis = file_info.get("analysis")
+            object_type = file_info.get("object_type")
+            if object_type is None:
+                object_type = "geo_raster_file" if analysis and analysis.get("is_georeferenced") else "raw_file"
+        
+            file_fields = {
+                "original_name": file_info["original_name"],
+                "file_path": file_info["file_path"],
+                "file_size": file_info["file_size"],
+                "mime_type": file_info["mime_type"],
+            }
+        
+            if object_type == "geo_raster_file":
+                if analysis is None:
+                    analysis = await blocking_pool.run(analyze_raster_file, file_info["file_path"])
+                map_config_path = file_info.get("map_config_path")
+                if not map_config_path:
+                    map_config_path = await blocking_pool.run(
+                        mapserver_service._create_map_config, file_info["file_path"], raster_info=analysis)
+                map_config_paths.append(map_config_path)
+                file_obj = GeoRasterFile(
+                    **file_fields,
+                    original_file_path=file_info.get("original_file_path"),
+                    map_config_path=map_config_path,
+                    is_georeferenced=True,  # Files created via this function are already georeferenced
+                    is_cog=analysis.get("is_cog", False),
+                    **GeoRasterFile.raster_info_fields(analysis)
+                )
+                geo_raster_files.append(file_obj)
+            else:
+                file_obj = RawFile(**file_fields, **RawFile.raster_info_fields(analysis))
+                raw_files.append(file_obj)
+        
+            # Create LTREE-compatible ID: use 'f' prefix + first 12 chars of UUID hex (no hyphens)
+            file_segment = f"f{uuid.uuid4().hex[:12]}"
+            file_parent_path = file_info.get("parent_path") or parent_path
+        
+            tree_item_fields = {}
+            if owner_user_id is not None:
+                tree_item_fields["owner_user_id"] = owner_user_id
+            if permissions is not None:
+                tree_item_fields["permissions"] = permissions
+        
+            # File metadata like the sha1 is kept in the tags
+            # A file's own tags replace the batch tags even if empty, like chunked uploads without tags
+            item_tags = dict(file_info["tags"] if file_info.get("tags") is not None else tags or {})
+            if file_info.get("sha1"):
+                item_tags["sha1"] = file_info["sha1"]
+            if file_info.get("composite_sha256"):
+                item_tags["composite_sha256"] = file_info["composite_sha256"]
+        
+            tree_items.append(TreeItem(
+                name=file_info["name"],
+                object_type=object_type,
+                object_id=file_obj.id,
+                path=f"{file_parent_path}.{file_segment}",
+                parent_path=file_parent_path,
+                tags=item_tags,
+                **tree_item_fields
+            ))
+            child_counts[file_parent_path] += 1
+        
+        if not tree_items:
+            return []
+        
+        async with in_transaction() as connection:
+            if raw_files:
+                await RawFile.bulk_create(raw_files, using_db=connection)
+            if geo_raster_files:
+                await GeoRasterFile.bulk_create(geo_raster_files, using_db=connection)
+            await TreeItem.bulk_create(tree_items, using_db=connection)
+            # One update per parent collection instead of one per file
+            for file_parent_path, count in child_counts.items():
+                await CollectionsService.adjust_child_count(file_parent_path, count, connection=connection)
+    except Exception:
+        await blocking_pool.run(_remove_files, map_config_paths)
+        raise
     
-    # Create the path: parent_path.file_segment
-    file_ltree_path = f"{parent_path}.{file_segment}"
+    return tree_items
 
-    user_tags = tags or {}
 
-    # Create RawFile (minimal model)
-    raw_file = await RawFile.create(
-        original_name=file_info["original_name"],
-        file_path=file_info["file_path"],
-        file_size=file_info["file_size"],
-        mime_type=file_info["mime_type"]
-    )
-    
-    # Create TreeItem
-    file_obj = await TreeItem.create(
-        name=file_info["name"],
-        object_type="raw_file",
-        object_id=raw_file.id,
-        path=file_ltree_path,
-        tags=user_tags
-    )
+async def create_file(file_info: Dict[str, str], tags: Dict[str, str] = None, parent_path: str = "root",
+                      analysis: Optional[Dict[str, Any]] = None) -> TreeItem:
+    """Create a new raw file record in the database.
     
-    return file_obj
+    Args:
+        file_info: Dictionary containing file information (original_name, file_path, file_size, mime_type, name)
+        tags: Optional dictionary of tags to apply
+        parent_path: Parent path in the tree structure (default: "root")
+        analysis: Optional analyze_raster_file result to persist with the file
+        
+    Returns:
+        TreeItem: The created tree item representing the file
+    """
+    tree_items = await create_files_bulk(
+        [{**file_info, "analysis": analysis, "object_type": "raw_file"}], tags=tags, parent_path=parent_path)
+    return tree_items[0]
 
 
-async def create_geo_file(file_info: Dict[str, str], tags: Dict[str, str] = None, parent_path: str = "root") -> TreeItem:
+async def create_geo_file(file_info: Dict[str, str], tags: Dict[str, str] = None, parent_path: str = "root",
+                          analysis: Optional[Dict[str, Any]] = None) -> TreeItem:
     """Create a new georeferenced raster file record in the database.
     
     Args:
         file_info: Dictionary containing file information (original_name, file_path, file_size, mime_type, name)
         tags: Optional dictionary of tags to apply
         parent_path: Parent path in the tree structure (default: "root")
+        analysis: Optional analyze_raster_file result, the file is analyzed if not given
         
     Returns:
         TreeItem: The created tree item representing the geo file
     """
-    
-    # Create LTREE-compatible ID: use 'f' prefix + first 12 chars of UUID hex (no hyphens)
-    file_uuid = str(uuid.uuid4()).replace('-', '')[:12]
-    file_segment = f"f{file_uuid}"
-    
-    # Create the path: parent_path.file_segment
-    file_ltree_path = f"{parent_path}.{file_segment}"
+    tree_items = await create_files_bulk(
+        [{**file_info, "analysis": analysis, "object_type": "geo_raster_file"}], tags=tags, parent_path=parent_path)
+    return tree_items[0]
 
-    user_tags = tags or {}
 
-    map_config_path = mapserver_service._create_map_config(file_info["file_path"])
-
-    # Create GeoRasterFile (minimal model)
-    geo_raster = await GeoRasterFile.create(
-        original_name=file_info["original_name"],
-        file_path=file_info["file_path"],
-        original_file_path=None,
-        file_size=file_info["file_size"],
-        mime_type=file_info["mime_type"],
-        map_config_path=map_config_path,
-        is_georeferenced=True  # Files created via this function are already georeferenced
-    )
+async def ingest_raw_file(tree_item: TreeItem) -> TreeItem:
+    """Analyze a file created by create_file without analysis and finish registering it
     
-
-    # Create TreeItem
-    file_obj = await TreeItem.create(
-        name=file_info["name"],
-        object_type="geo_raster_file",
-        object_id=geo_raster.id,
-        path=file_ltree_path,
-        tags=user_tags
-    )
-
-    return file_obj
+    Used by the asynchronous ingest mode: the upload request only stores the file as a
+    RawFile, this runs later in a worker. Georeferenced files are turned into a
+    GeoRasterFile with a map config in place, others get their raster info stored.
+    
+    Args:
+        tree_item: The tree item of the uploaded raw file
+        
+    Returns:
+        TreeItem: The updated tree item
+    """
+    raw_file = await tree_item.get_object()
+    if not isinstance(raw_file, RawFile):
+        raise ValueError(f"TreeItem {tree_item.id} is not a raw file")
+    
+    analysis = await blocking_pool.run(analyze_raster_file, raw_file.file_path)
+    
+    if not analysis.get("is_georeferenced", False):
+        # Stored also for files GDAL cannot open, so they are not analyzed again
+        raw_file.set_raster_info(analysis)
+        await raw_file.save(update_fields=RASTER_INFO_FIELDS)
+        return tree_item
+    
+    map_config_path = await blocking_pool.run(
+        mapserver_service._create_map_config, raw_file.file_path, raster_info=analysis)
+    
+    async with in_transaction() as connection:
+        geo_raster = await GeoRasterFile.create(
+            original_name=raw_file.original_name,
+            file_path=raw_file.file_path,
+            original_file_path=None,
+            file_size=raw_file.file_size,
+            mime_type=raw_file.mime_type,
+            map_config_path=map_config_path,
+            is_georeferenced=True,
+            is_cog=analysis.get("is_cog", False),
+            **GeoRasterFile.raster_info_fields(analysis),
+            using_db=connection
+        )
+        
+        # The file on disk is kept, only the record changes type
+        tree_item.object_type = "geo_raster_file"
+        tree_item.object_id = geo_raster.id
+        await tree_item.save(update_fields=["object_type", "object_id", "updated_at"], using_db=connection)
+        await raw_file.delete(using_db=connection)
+    
+    return tree_item
 
 
 async def convert_to_geo_raster(raw_file: RawFile, upload_dir: str = "uploads", progress_callback=None) -> TreeItem:
@@ -130,19 +252,35 @@ async def convert_to_geo_raster(raw_file: RawFile, upload_dir: str = "uploads",
     # Create progress callback for georeferencing that maps to overall progress
     def georef_progress_callback(progress, message):
         if progress_callback:
-            # Map georeferencing progress (0.0-1.0) to overall progress (0.2-0.7)
-            overall_progress = 0.2 + (progress * 0.5)
+            # Map georeferencing progress (0.0-1.0) to overall progress (0.2-0.55)
+            overall_progress = 0.2 + (progress * 0.35)
             progress_callback(overall_progress, f"Georeferencing: {message}")
     
     if progress_callback:
         progress_callback(0.2, "Creating georeferenced file...")
     
-    dummy_georeferenced_file_path = create_dummy_georeferenced_file(raw_file.file_path, upload_dir, progress_callback=georef_progress_callback)
+    dummy_georeferenced_file_path = create_dummy_georeferenced_file(
+        raw_file.file_path, upload_dir, progress_callback=georef_progress_callback,
+        output_dir=FileService.get_derived_file_dir(raw_file.file_path))
+    
+    def overviews_progress_callback(progress, message):
+        if progress_callback:
+            # Map overview progress (0.0-1.0) to overall progress (0.55-0.7)
+            overall_progress = 0.55 + (progress * 0.15)
+            progress_callback(overall_progress, f"Overviews: {message}")
+    
+    # If georeferencing failed the original itself is returned, overviews would be written into it
+    if dummy_georeferenced_file_path != raw_file.file_path and FileService.can_modify_in_place(dummy_georeferenced_file_path):
+        if progress_callback:
+            progress_callback(0.55, "Building overviews...")
+        
+        build_overviews(dummy_georeferenced_file_path, progress_callback=overviews_progress_callback)
     
     if progress_callback:
         progress_callback(0.7, "Creating map configuration...")
     
-    map_config_path = mapserver_service._create_map_config(dummy_georeferenced_file_path)
+    geo_analysis = analyze_raster_file(dummy_georeferenced_file_path)
+    map_config_path = mapserver_service._create_map_config(dummy_georeferenced_file_path, raster_info=geo_analysis)
     
     if progress_callback:
         progress_callback(0.8, "Creating database records...")
@@ -154,7 +292,9 @@ async def convert_to_geo_raster(raw_file: RawFile, upload_dir: str = "uploads",
         file_size=raw_file.file_size,
         mime_type=raw_file.mime_type,
         map_config_path=map_config_path,
-        is_georeferenced=False
+        is_georeferenced=False,
+        is_cog=geo_analysis.get("is_cog", False),
+        **GeoRasterFile.raster_info_fields(geo_analysis)
     )
     await geo_raster.save()
     
@@ -163,10 +303,25 @@ async def convert_to_geo_raster(raw_file: RawFile, upload_dir: str = "uploads",
     
     await raw_file.delete()
     
-    if os.path.exists(raw_file.file_path):
+    # Files registered in place are not ours to remove, the fallback path is the original itself
+    if (FileService.is_managed_path(raw_file.file_path) and raw_file.file_path != dummy_georeferenced_file_path
+            and os.path.exists(raw_file.file_path)):
         os.remove(raw_file.file_path)
     
     if progress_callback:
         progress_callback(1.0, "Raster conversion completed successfully")
     
-    return geo_raster
\ No newline at end of file
+    return geo_raster
+
+
+async def update_raster_info(file_obj: Union[RawFile, GeoRasterFile]) -> Dict[str, Any]:
+    """Analyze a file and persist the result, for rows created before raster info was stored
+    
+    Returns:
+        The analyze_raster_file result
+    """
+    analysis = await blocking_pool.run(analyze_raster_file, str(file_obj.file_path))
+    # A failed analysis is remembered too, GDAL is not run on the file again
+    file_obj.set_raster_info(analysis)
+    await file_obj.save(update_fields=RASTER_INFO_FIELDS)
+    return analysis
@@ -1,6 +1,10 @@
 from .collections import CollectionsService
 from .files import FileService
-from .geo import analyze_raster_file, create_dummy_georeferenced_file
+from .tile_cache import TileCache
+from .tile_renderer import TileRenderer
+from .metadata_cache import FileMetadataCache
+from .executor import BlockingPool
+from .geo import analyze_raster_file, create_dummy_georeferenced_file, build_overviews, is_cloud_optimized
 from .georeference import (
     ControlPoint,
     calculate_transform_from_control_points,
@@ -11,8 +15,14 @@ from .georeference import (
 __all__ = [
     'CollectionsService',
     'FileService', 
+    'TileCache',
+    'TileRenderer',
+    'FileMetadataCache',
+    'BlockingPool',
     'analyze_raster_file',
     'create_dummy_georeferenced_file',
+    'build_overviews',
+    'is_cloud_optimized',
     'ControlPoint',
     'calculate_transform_from_control_points',
     'warp_image_with_control_points',
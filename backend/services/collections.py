@@ -1,12 +1,49 @@
-from models import TreeItem, Collection
+from models import TreeItem, Collection, User
+import base64
+import json
+import os
 import uuid
 import datetime
 from typing import List, Optional, Dict, Any, Tuple
+from tortoise.transactions import in_transaction
 
 
 # Constants
 ROOT_COLLECTION_ID = "00000000-0000-0000-0000-000000000000"
 
+# Spatial filter operators on the WGS84 footprint of a geo raster file
+# "contains": footprint contains the bbox (e.g. maps covering a point), "within": footprint inside the bbox
+SPATIAL_RELATION_OPERATORS = {
+    "intersects": "&&",
+    "contains": "@>",
+    "within": "<@",
+}
+
+# Search total count modes: "exact" COUNT(*), "estimated" planner row estimate,
+# "capped" COUNT(*) that stops after SEARCH_COUNT_CAP rows
+SEARCH_COUNT_MODES = {"exact", "estimated", "capped"}
+SEARCH_COUNT_CAP = int(os.getenv("SEARCH_COUNT_CAP", "10000"))
+
+# Must match the expression of idx_geo_raster_files_footprint so the GiST index is used
+FOOTPRINT_EXPRESSION = "box(point(wgs84_min_x, wgs84_min_y), point(wgs84_max_x, wgs84_max_y))"
+
+
+
+def encode_cursor(item: TreeItem) -> str:
+    """Opaque pagination cursor pointing at an item's (created_at, id) position"""
+    payload = json.dumps({"c": item.created_at.isoformat(), "i": str(item.id)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, uuid.UUID]:
+    """Decode a cursor from encode_cursor, raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.datetime.fromisoformat(payload["c"]), uuid.UUID(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
 
 class CollectionsService:
     
@@ -20,20 +57,24 @@ class CollectionsService:
         # Create the path: parent_path.collection_segment
         collection_path = f"{parent_path}.{collection_segment}"
         
-        # Create Collection (minimal model - data stored in TreeItem.tags)
-        collection = await Collection.create()
-        
         # Prepare tags with name and description
         collection_tags = tags.copy() if tags else {}
         
-        # Create TreeItem
-        tree_item_obj = await TreeItem.create(
-            name=name,
-            object_type="collection",
-            object_id=collection.id,
-            path=collection_path,
-            tags=collection_tags
-        )
+        async with in_transaction() as connection:
+            # Create Collection (minimal model - data stored in TreeItem.tags)
+            collection = await Collection.create(using_db=connection)
+            
+            # Create TreeItem
+            tree_item_obj = await TreeItem.create(
+                name=name,
+                object_type="collection",
+                object_id=collection.id,
+                path=collection_path,
+                parent_path=parent_path,
+                tags=collection_tags,
+                using_db=connection
+            )
+            await cls.adjust_child_count(parent_path, 1, connection=connection)
         
         return tree_item_obj
     
@@ -48,28 +89,56 @@ class CollectionsService:
         return await TreeItem.get_or_none(path=path, object_type="collection")
     
     @classmethod
-    async def _update_descendant_paths(cls, old_path: str, new_path: str):
+    async def adjust_child_count(cls, parent_path: Optional[str], delta: int, connection=None):
+        """Add delta to the child_count of the collection at parent_path
+        
+        Call in the same transaction that creates, moves or deletes the child.
+        """
+        if not parent_path or not delta:
+            return
+        if connection is None:
+            from tortoise import connections
+            connection = connections.get("default")
+        
+        await connection.execute_query(
+            "UPDATE tree_items SET child_count = child_count + $2 WHERE path = $1",
+            [parent_path, delta]
+        )
+    
+    @classmethod
+    async def _update_descendant_paths(cls, old_path: str, new_path: str, connection=None):
         """Update paths of all descendants when a collection is moved"""
         # Update all tree items that have paths starting with old_path
-        from tortoise import connections
-        connection = connections.get("default")
+        if connection is None:
+            from tortoise import connections
+            connection = connections.get("default")
         
-        # Update all tree items (both files and collections)
+        # Update all tree items (both files and collections), direct children get new_path as parent
         await connection.execute_query(
-            "UPDATE tree_items SET path = $1 || subpath(path, nlevel($2)) WHERE path <@ $2 AND path != $2",
+            """
+            UPDATE tree_items SET
+                path = $1 || subpath(path, nlevel($2)),
+                parent_path = CASE WHEN parent_path = $2 THEN $1 ELSE $1 || subpath(parent_path, nlevel($2)) END
+            WHERE path <@ $2 AND path != $2
+            """,
             [new_path, old_path]
         )
     
     @classmethod
-    async def delete_collection(cls, collection_id: str, force: bool = False):
-        """Delete collection and optionally its contents"""
+    async def delete_collection(cls, collection_id: str, force: bool = False) -> List[Dict[str, Any]]:
+        """Delete collection and optionally its contents
+        
+        Returns the deleted tree items (id, object_type, object_id), the collection
+        itself included, so callers can drop cached data of every deleted file.
+        Empty if the collection does not exist.
+        """
         # Prevent deletion of root collection
         if collection_id == ROOT_COLLECTION_ID:
             raise ValueError("Cannot delete the root collection")
             
         collection = await TreeItem.get_or_none(id=collection_id, object_type="collection")
         if not collection:
-            return False
+            return []
         
         collection_path = collection.path
         
@@ -87,42 +156,106 @@ class CollectionsService:
             if item_count[0]['count'] > 0:
                 raise ValueError("Collection is not empty. Use force=True to delete anyway.")
         
-        # If force=True, delete all contents first
-        if force:
-            from tortoise import connections
-            connection = connections.get("default")
+        deleted = []
+        async with in_transaction() as connection:
+            # If force=True, delete all contents first
+            if force:
+                # Delete all items in this collection and its descendants
+                deleted = await connection.execute_query_dict(
+                    "DELETE FROM tree_items WHERE path <@ $1 AND path != $1 RETURNING id, object_type, object_id",
+                    [collection_path]
+                )
             
-            # Delete all items in this collection and its descendants
-            await connection.execute_query(
-                "DELETE FROM tree_items WHERE path <@ $1 AND path != $1",
-                [collection_path]
-            )
+            await collection.delete(using_db=connection)
+            await cls.adjust_child_count(collection.parent_path, -1, connection=connection)
         
-        await collection.delete()
-        return True
+        deleted.append({"id": collection.id, "object_type": collection.object_type, "object_id": collection.object_id})
+        return deleted
     
     @classmethod
-    async def list_collection_contents(cls, collection_path: str = "root", skip: int = 0, limit: int = 100):
-        """List files and subcollections in a collection as one iterable"""
+    async def _read_permission_clause(cls, user: Optional[User], param_idx: int) -> Tuple[Optional[str], list]:
+        """SQL condition matching the tree items user can read, mirrors TreeItem.can_read
+        
+        Returns (clause, params) with placeholders starting at param_idx, or
+        (None, []) if the user can read everything.
+        """
+        if user is None:
+            # Anonymous users only get "other" read (0o004)
+            return "(permissions & 4) <> 0", []
+        
+        if user.is_admin:
+            return None, []
+        
+        group_ids = list(await user.get_group_ids())
+        # Owner (0o400), group (0o040) and other (0o004) read bits, the first matching class decides
+        clause = (
+            f"CASE WHEN owner_user_id = ${param_idx} THEN (permissions & 256) <> 0 "
+            f"WHEN owner_group_id = ANY(${param_idx + 1}::uuid[]) THEN (permissions & 32) <> 0 "
+            f"ELSE (permissions & 4) <> 0 END"
+        )
+        return clause, [user.id, group_ids]
+    
+    @classmethod
+    async def count_collection_contents(cls, collection: TreeItem, user: Optional[User] = None,
+                                        check_permissions: bool = False) -> int:
+        """Number of direct children of a collection, optionally only those user can read"""
+        permission_clause = None
+        params = [collection.path]
+        if check_permissions:
+            permission_clause, permission_params = await cls._read_permission_clause(user, 2)
+            params.extend(permission_params)
+        
+        # Admins and unchecked listings use the maintained counter
+        if not permission_clause:
+            return collection.child_count
+        
+        from tortoise import connections
+        connection = connections.get("default")
+        result = await connection.execute_query_dict(
+            f"SELECT COUNT(*) as count FROM tree_items WHERE parent_path = $1 AND {permission_clause}",
+            params
+        )
+        return result[0]["count"]
+    
+    @classmethod
+    async def list_collection_contents(cls, collection_path: str = "root", skip: int = 0, limit: int = 100,
+                                       cursor: Optional[str] = None, user: Optional[User] = None,
+                                       check_permissions: bool = False):
+        """List files and subcollections in a collection as one iterable
+        
+        Items are ordered by (created_at, id). Pass the cursor of the last item of
+        the previous page (see encode_cursor) to continue after it without an OFFSET scan.
+        With check_permissions, only items user (None for anonymous) can read are returned.
+        """
         # Use raw SQL with proper parameterization and manual model instantiation
         from tortoise import connections
         
         connection = connections.get("default")
         
-        # Construct regex pattern safely - escape special characters for PostgreSQL regex
-        # Pattern matches paths that are direct children of collection_path
-        regex_pattern = f"{collection_path}.*{{1}}"
+        # Direct children are found through the indexed parent_path column
+        conditions = ["parent_path = $1"]
+        params = [collection_path]
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            conditions.append(f"(created_at, id) > (${len(params) + 1}, ${len(params) + 2})")
+            params.extend([cursor_created_at, cursor_id])
+        
+        if check_permissions:
+            permission_clause, permission_params = await cls._read_permission_clause(user, len(params) + 1)
+            if permission_clause:
+                conditions.append(permission_clause)
+                params.extend(permission_params)
         
         # Use parameterized query to prevent SQL injection
-        query = """
+        query = f"""
             SELECT * FROM tree_items 
-            WHERE path ~ $1 
-            ORDER BY created_at 
-            OFFSET $2 LIMIT $3
+            WHERE {" AND ".join(conditions)}
+            ORDER BY created_at, id 
+            OFFSET ${len(params) + 1} LIMIT ${len(params) + 2}
         """
         
         # Execute raw query and get results
-        results = await connection.execute_query_dict(query, [regex_pattern, skip, limit])
+        results = await connection.execute_query_dict(query, params + [skip, limit])
         
         # Manually instantiate TreeItem objects with proper field mapping
         items = []
@@ -137,6 +270,8 @@ class CollectionsService:
                 created_at=row['created_at'],
                 updated_at=row['updated_at'],
                 path=row['path'],
+                parent_path=row['parent_path'],
+                child_count=row['child_count'],
                 permissions=row['permissions'],
             )
             item.owner_user_id = row.get('owner_user_id')
@@ -157,12 +292,28 @@ class CollectionsService:
         collection_path: Optional[str] = None,
         created_after: Optional[datetime.datetime] = None,
         created_before: Optional[datetime.datetime] = None,
+        bbox: Optional[List[float]] = None,
+        spatial_relation: str = "intersects",
         skip: int = 0,
         limit: int = 100,
-    ) -> Tuple[List[TreeItem], int]:
-        """Search tree items with filters. Returns (items, total_count)."""
+        cursor: Optional[str] = None,
+        count_mode: str = "exact",
+        user: Optional[User] = None,
+        check_permissions: bool = False,
+    ) -> Tuple[List[TreeItem], int, bool]:
+        """Search tree items with filters. Returns (items, total_count, total_is_estimate).
+        
+        count_mode selects how total_count is computed, see SEARCH_COUNT_MODES.
+        With check_permissions, only items user (None for anonymous) can read are
+        returned and counted.
+        
+        bbox is [min_x, min_y, max_x, max_y] in WGS84 and only matches geo raster
+        files, compared to their footprint with spatial_relation.
+        
+        Results are ordered newest first by (created_at, id); cursor continues after
+        the item it was encoded from. total_count ignores the cursor.
+        """
         from tortoise import connections
-        import json
 
         connection = connections.get("default")
 
@@ -223,20 +374,41 @@ class CollectionsService:
             params.append(created_before)
             param_idx += 1
 
+        # Spatial filter on the geo raster footprint
+        if bbox:
+            operator = SPATIAL_RELATION_OPERATORS[spatial_relation]
+            conditions.append(
+                f"object_type = 'geo_raster_file' AND object_id IN ("
+                f"SELECT id FROM geo_raster_files WHERE wgs84_min_x IS NOT NULL AND {FOOTPRINT_EXPRESSION} {operator} "
+                f"box(point(${param_idx}, ${param_idx + 1}), point(${param_idx + 2}, ${param_idx + 3})))"
+            )
+            params.extend(float(value) for value in bbox)
+            param_idx += 4
+
+        # Per-item read permission
+        if check_permissions:
+            permission_clause, permission_params = await cls._read_permission_clause(user, param_idx)
+            if permission_clause:
+                conditions.append(permission_clause)
+                params.extend(permission_params)
+                param_idx += len(permission_params)
+
         where_clause = " AND ".join(conditions) if conditions else "TRUE"
 
-        # Get total count
-        count_query = f"SELECT COUNT(*) as count FROM tree_items WHERE {where_clause}"
-        count_result = await connection.execute_query_dict(count_query, list(params))
-        total = count_result[0]["count"]
+        total, total_is_estimate = await cls._count_matches(connection, where_clause, params, count_mode)
 
         # Get paginated results (use a copy of params to avoid mutation issues)
         data_params = list(params)
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            where_clause = f"{where_clause} AND (created_at, id) < (${param_idx}, ${param_idx + 1})"
+            data_params.extend([cursor_created_at, cursor_id])
+            param_idx += 2
         data_params.extend([skip, limit])
         data_query = f"""
             SELECT * FROM tree_items
             WHERE {where_clause}
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             OFFSET ${param_idx} LIMIT ${param_idx + 1}
         """
 
@@ -253,6 +425,8 @@ class CollectionsService:
                 created_at=row["created_at"],
                 updated_at=row["updated_at"],
                 path=row["path"],
+                parent_path=row["parent_path"],
+                child_count=row["child_count"],
                 permissions=row["permissions"],
             )
             item.owner_user_id = row.get("owner_user_id")
@@ -260,4 +434,33 @@ class CollectionsService:
             item._saved_in_db = True
             items.append(item)
 
-        return items, total
+        return items, total, total_is_estimate
+
+    @classmethod
+    async def _count_matches(cls, connection, where_clause: str, params: list, count_mode: str) -> Tuple[int, bool]:
+        """Count tree items matching where_clause. Returns (count, is_estimate)."""
+        if count_mode == "estimated":
+            # Planner estimate from table statistics, costs no scan at all
+            plan = await connection.execute_query_dict(
+                f"EXPLAIN (FORMAT JSON) SELECT 1 FROM tree_items WHERE {where_clause}", list(params)
+            )
+            plan_json = plan[0]["QUERY PLAN"]
+            if isinstance(plan_json, str):
+                plan_json = json.loads(plan_json)
+            return int(plan_json[0]["Plan"]["Plan Rows"]), True
+
+        if count_mode == "capped":
+            # Stop counting once the cap is reached, beyond it the exact number rarely matters
+            count_result = await connection.execute_query_dict(
+                f"SELECT COUNT(*) as count FROM (SELECT 1 FROM tree_items WHERE {where_clause} LIMIT {SEARCH_COUNT_CAP + 1}) capped",
+                list(params)
+            )
+            count = count_result[0]["count"]
+            if count > SEARCH_COUNT_CAP:
+                return SEARCH_COUNT_CAP, True
+            return count, False
+
+        count_result = await connection.execute_query_dict(
+            f"SELECT COUNT(*) as count FROM tree_items WHERE {where_clause}", list(params)
+        )
+        return count_result[0]["count"], False
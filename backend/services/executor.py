@@ -0,0 +1,95 @@
+"""
+Bounded thread pool for blocking GDAL and filesystem work called from async handlers
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class BlockingPool:
+    """Run blocking calls (GDAL opens, file copies, map config writes) off the event loop.
+
+    The pool is bounded, so a burst of large uploads queues up here instead of
+    occupying every thread; GDAL releases the GIL during I/O, so threads are
+    enough. Tile rendering keeps its own pool in TileRenderer so ingest work
+    never delays tiles. Queue depth and wait times are kept for /health.
+    """
+
+    def __init__(self, max_workers=None, name="blocking"):
+        self.max_workers = max_workers or int(os.getenv("BLOCKING_POOL_WORKERS", str(min(4, os.cpu_count() or 4))))
+        self.name = name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queued = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call func(*args, **kwargs) in the pool and wait for its result"""
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        def call():
+            wait = time.monotonic() - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    if failed:
+                        self._failed += 1
+
+        def on_done(future):
+            # Calls cancelled while still queued never start
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+
+        future = self._get_executor().submit(call)
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth and counters since startup"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "max_queued": self._max_queued,
+                "avg_wait_seconds": round(self._total_wait / self._completed, 4) if self._completed else 0.0,
+                "max_wait_seconds": round(self._max_wait, 4),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+blocking_pool = BlockingPool()
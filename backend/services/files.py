@@ -1,15 +1,38 @@
 from models import TreeItem
+import asyncio
+import hashlib
 import os
 import mimetypes
+import shutil
 import uuid
 import aiofiles
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from fastapi import UploadFile
 from datetime import datetime
+from tortoise.transactions import in_transaction
+
+from .collections import CollectionsService
+from .executor import blocking_pool
+
+
+# Chunked upload sizing, clients may request any chunk size within the bounds
+MIB = 1024 * 1024
+CHUNK_SIZE_MIN = int(os.getenv("CHUNK_SIZE_MIN", str(5 * MIB)))
+CHUNK_SIZE_MAX = int(os.getenv("CHUNK_SIZE_MAX", str(100 * MIB)))
+# Recommended chunk sizes aim for about this many chunks per upload
+CHUNK_TARGET_COUNT = int(os.getenv("CHUNK_TARGET_COUNT", "32"))
+# Files up to this size are cheaper to send with a single POST /files
+CHUNKED_UPLOAD_THRESHOLD = int(os.getenv("CHUNKED_UPLOAD_THRESHOLD", str(75 * MIB)))
+# Largest file a chunked upload session may be started for
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(50 * 1024 * MIB)))
 
 
 class FileService:
     UPLOAD_DIR = "uploads"
+    # Uploads are streamed to disk in blocks of this size, memory use does not grow with the file
+    UPLOAD_BLOCK_SIZE = 1024 * 1024
+    # Chunked uploads are written in place into this file inside the session temp dir
+    ASSEMBLY_FILENAME = "upload.part"
     
     @classmethod
     def _generate_upload_path(cls) -> str:
@@ -22,9 +45,44 @@ class FileService:
         folder_path = os.path.join(cls.UPLOAD_DIR, year, month, str(uuid.uuid4()))
         return folder_path
     
+    @classmethod
+    def is_managed_path(cls, file_path: str) -> bool:
+        """Whether a file lies inside the upload directory and belongs to the app
+        
+        Files registered in place by bulkimport stay where they are, they must
+        never be modified, deleted or get derived files written next to them.
+        """
+        upload_dir = os.path.realpath(cls.UPLOAD_DIR)
+        return os.path.realpath(file_path).startswith(upload_dir + os.sep)
+    
+    @classmethod
+    def can_modify_in_place(cls, file_path: str) -> bool:
+        """Whether a file may be written to, e.g. to add overviews
+        
+        Only files in the upload directory that no other path links to, hard links
+        made by bulkimport --mode link share their data with the original.
+        """
+        return cls.is_managed_path(file_path) and os.stat(file_path).st_nlink <= 1
+    
+    @classmethod
+    def get_derived_file_dir(cls, file_path: str) -> str:
+        """Directory for files derived from file_path, e.g. warped or converted rasters
+        
+        Next to the file when the app owns it, otherwise a new upload directory.
+        """
+        if cls.is_managed_path(file_path):
+            return os.path.dirname(file_path)
+        upload_path = cls._generate_upload_path()
+        os.makedirs(upload_path, exist_ok=True)
+        return upload_path
+    
     @classmethod
     async def save_uploaded_file(cls, file: UploadFile) -> Dict[str, Any]:
-        """Save uploaded file to disk and return file info"""
+        """Save uploaded file to disk and return file info
+        
+        The upload is streamed in UPLOAD_BLOCK_SIZE blocks; size and sha1 are
+        computed while writing, the sha1 is stored in the tree item tags.
+        """
 
         upload_path = cls._generate_upload_path()
         os.makedirs(upload_path, exist_ok=True)
@@ -35,9 +93,17 @@ class FileService:
         file_path = os.path.join(upload_path, unique_filename)
         
         # Save file
-        content = await file.read()
+        sha1 = hashlib.sha1()
+        file_size = 0
         async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
+            while True:
+                block = await file.read(cls.UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                # hashlib releases the GIL, hash in a thread to keep the event loop free
+                await asyncio.to_thread(sha1.update, block)
+                file_size += len(block)
+                await f.write(block)
 
         mime_type, _ = mimetypes.guess_type(file_path)
         
@@ -45,8 +111,9 @@ class FileService:
             "original_name": file.filename,
             "name": unique_filename,
             "file_path": file_path,
-            "file_size": len(content),
-            "mime_type": mime_type or "application/octet-stream"
+            "file_size": file_size,
+            "mime_type": mime_type or "application/octet-stream",
+            "sha1": sha1.hexdigest()
         }
     
     @classmethod
@@ -63,15 +130,119 @@ class FileService:
             
         # Remove file from disk
         file_path = await file_obj.get_file_path()
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+        # Files registered in place are only unregistered
+        if file_path and cls.is_managed_path(file_path) and os.path.exists(file_path):
+            # Unlinking a multi-GB file can take a while on some filesystems
+            await blocking_pool.run(os.remove, file_path)
             
-        await file_obj.delete()
+        async with in_transaction() as connection:
+            await file_obj.delete(using_db=connection)
+            await CollectionsService.adjust_child_count(file_obj.parent_path, -1, connection=connection)
         return True
     
+    @staticmethod
+    def recommend_chunk_size(file_size: int) -> int:
+        """Chunk size for a file: about CHUNK_TARGET_COUNT chunks, whole MiB, within the bounds"""
+        chunk_size = -(-file_size // CHUNK_TARGET_COUNT)
+        chunk_size = -(-chunk_size // MIB) * MIB
+        return FileService.clamp_chunk_size(chunk_size)
+    
+    @staticmethod
+    def clamp_chunk_size(chunk_size: int) -> int:
+        """Limit a requested chunk size to CHUNK_SIZE_MIN..CHUNK_SIZE_MAX"""
+        return max(CHUNK_SIZE_MIN, min(CHUNK_SIZE_MAX, chunk_size))
+    
+    @classmethod
+    def _assembly_path(cls, temp_dir: str) -> str:
+        return os.path.join(temp_dir, cls.ASSEMBLY_FILENAME)
+    
     @classmethod
-    async def combine_chunks(cls, temp_dir: str, total_chunks: int, original_filename: str) -> str:
-        """Combine uploaded chunks into a single file"""
+    def preallocate_chunked_upload(cls, temp_dir: str, file_size: int) -> str:
+        """Create the file chunks of a chunked upload are written into, at its final size
+        
+        The file is sparse, disk space is only used as chunks arrive. Raises OSError
+        if the disk does not have file_size bytes free, so a full disk fails at init
+        instead of mid-upload.
+        """
+        os.makedirs(temp_dir, exist_ok=True)
+        free = shutil.disk_usage(temp_dir).free
+        if file_size > free:
+            raise OSError(f"Not enough disk space, {file_size} bytes needed and {free} free")
+        assembly_path = cls._assembly_path(temp_dir)
+        fd = os.open(assembly_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, file_size)
+        finally:
+            os.close(fd)
+        return assembly_path
+    
+    @classmethod
+    async def write_chunk(cls, temp_dir: str, offset: int, chunk: UploadFile, max_size: int) -> Tuple[int, str]:
+        """Stream a chunk into the preallocated upload file at its final offset
+        
+        At most max_size bytes are written so an oversized chunk cannot overwrite
+        the next one.
+        
+        Returns:
+            (size of the received chunk (may exceed max_size), sha256 of the written bytes)
+        """
+        received = 0
+        sha256 = hashlib.sha256()
+        async with aiofiles.open(cls._assembly_path(temp_dir), 'r+b') as f:
+            await f.seek(offset)
+            while True:
+                block = await chunk.read(cls.UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                if received < max_size:
+                    block_to_write = block[:max_size - received]
+                    sha256.update(block_to_write)
+                    await f.write(block_to_write)
+                received += len(block)
+        return received, sha256.hexdigest()
+    
+    @staticmethod
+    def composite_checksum(chunk_checksums: Dict[str, str], total_chunks: int) -> Optional[str]:
+        """Whole-upload checksum: sha256 over the concatenated binary sha256 digests of all chunks
+        
+        Computed from the per-chunk digests recorded while writing, so verifying an
+        upload needs no extra pass over the file. None if a chunk digest is missing.
+        """
+        composite = hashlib.sha256()
+        for chunk_number in range(total_chunks):
+            chunk_checksum = chunk_checksums.get(str(chunk_number))
+            if chunk_checksum is None:
+                return None
+            composite.update(bytes.fromhex(chunk_checksum))
+        return composite.hexdigest()
+    
+    @staticmethod
+    def remove_upload_dir(temp_dir: str) -> int:
+        """Delete a chunked upload temp directory and return the disk space it used, in bytes
+        
+        Counts allocated blocks rather than file sizes, preallocated and sparse
+        upload files take exactly that much space.
+        """
+        reclaimed = 0
+        for dirpath, _, filenames in os.walk(temp_dir):
+            for filename in filenames:
+                try:
+                    reclaimed += os.lstat(os.path.join(dirpath, filename)).st_blocks * 512
+                except OSError:
+                    pass
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return reclaimed
+    
+    @classmethod
+    def finalize_chunked_upload(cls, temp_dir: str, original_filename: str) -> str:
+        """Move the assembled upload file to its final upload path
+        
+        Chunks were written in place, so this is a rename and takes constant time.
+        """
+        assembly_path = cls._assembly_path(temp_dir)
+        if not os.path.exists(assembly_path):
+            raise FileNotFoundError(f"Upload file not found in {temp_dir}")
+        
         # Generate final upload path
         upload_path = cls._generate_upload_path()
         os.makedirs(upload_path, exist_ok=True)
@@ -81,15 +252,30 @@ class FileService:
         unique_filename = f"{uuid.uuid4()}{file_extension}"
         final_file_path = os.path.join(upload_path, unique_filename)
         
-        # Combine chunks in order
-        async with aiofiles.open(final_file_path, 'wb') as final_file:
-            for chunk_number in range(total_chunks):
-                chunk_path = os.path.join(temp_dir, f"chunk_{chunk_number}")
-                if not os.path.exists(chunk_path):
-                    raise FileNotFoundError(f"Chunk {chunk_number} not found")
-                
-                async with aiofiles.open(chunk_path, 'rb') as chunk_file:
-                    chunk_data = await chunk_file.read()
-                    await final_file.write(chunk_data)
-        
-        return final_file_path
\ No newline at end of file
+        os.replace(assembly_path, final_file_path)
+        return final_file_path
+    
+    @classmethod
+    def restore_chunked_upload(cls, temp_dir: str, file_path: str) -> bool:
+        """Move a finalized upload file back into its session temp dir, undoing finalize_chunked_upload
+        
+        Used when the file could not be registered, the upload can then be completed again.
+        Returns False if the temp dir is gone, the file is removed in that case.
+        """
+        if not os.path.isdir(temp_dir):
+            cls.remove_uploaded_file(file_path)
+            return False
+        os.replace(file_path, cls._assembly_path(temp_dir))
+        cls.remove_uploaded_file(file_path)
+        return True
+    
+    @staticmethod
+    def remove_uploaded_file(file_path: str):
+        """Delete a file saved to the upload path that was not registered, and its directory"""
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        # The upload directory was created for this file only
+        try:
+            os.rmdir(os.path.dirname(file_path))
+        except OSError:
+            pass
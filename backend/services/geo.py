@@ -1,16 +1,113 @@
 from osgeo import gdal, osr
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import os
 import uuid
 
 
+# Overview (pyramid) settings, levels are comma separated decimation factors, empty = automatic
+OVERVIEW_RESAMPLING = os.getenv("OVERVIEW_RESAMPLING", "AVERAGE")
+OVERVIEW_LEVELS = [int(level) for level in os.getenv("OVERVIEW_LEVELS", "").split(",") if level.strip()]
+OVERVIEW_MIN_SIZE = 256
+
+# Output format of converted and warped rasters: "GTiff" (tiled GeoTIFF) or "COG" (Cloud-Optimized GeoTIFF)
+RASTER_OUTPUT_FORMAT = os.getenv("RASTER_OUTPUT_FORMAT", "GTiff")
+COG_COMPRESSION = os.getenv("COG_COMPRESSION", "ZSTD")
+COG_PREDICTOR = os.getenv("COG_PREDICTOR", "YES")
+
+# Predictors only make sense for lossless codecs
+PREDICTOR_COMPRESSIONS = {"ZSTD", "LZW", "DEFLATE", "LZMA"}
+
+
+def use_cog_output() -> bool:
+    """Whether converted and warped rasters should be written as COG"""
+    return RASTER_OUTPUT_FORMAT.upper() == "COG"
+
+
+def get_cog_creation_options(compression: Optional[str] = None, predictor: Optional[str] = None) -> List[str]:
+    """Creation options for the GDAL COG driver (internal overviews are always generated)"""
+    compression = (compression or COG_COMPRESSION).upper()
+    predictor = predictor or COG_PREDICTOR
+
+    options = [
+        f'COMPRESS={compression}',
+        'BLOCKSIZE=256',
+        'OVERVIEWS=AUTO',
+        f'OVERVIEW_RESAMPLING={OVERVIEW_RESAMPLING}',
+        'NUM_THREADS=ALL_CPUS',
+        'BIGTIFF=IF_SAFER',
+    ]
+    if compression in PREDICTOR_COMPRESSIONS and predictor:
+        options.append(f'PREDICTOR={predictor}')
+    return options
+
+
+def is_cloud_optimized(file_path: str) -> bool:
+    """Check whether a file is a Cloud-Optimized GeoTIFF"""
+    try:
+        ds = gdal.Open(str(file_path))
+        if ds is None:
+            return False
+        return ds.GetMetadataItem('LAYOUT', 'IMAGE_STRUCTURE') == 'COG'
+    except Exception:
+        return False
+
+
+def get_wgs84_bounds(geotransform, width: int, height: int, projection_wkt: str) -> Optional[List[float]]:
+    """Bounding box [min_x, min_y, max_x, max_y] in WGS84 lon/lat, or None without a projection"""
+    if not projection_wkt or not projection_wkt.strip():
+        return None
+
+    try:
+        source_srs = osr.SpatialReference()
+        source_srs.ImportFromWkt(projection_wkt)
+        target_srs = osr.SpatialReference()
+        target_srs.ImportFromEPSG(4326)
+        # Always lon/lat, regardless of the EPSG axis order
+        source_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        target_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        transform = osr.CoordinateTransformation(source_srs, target_srs)
+
+        # Transform all four corners, the extent may be rotated in WGS84
+        corners = []
+        for pixel, line in ((0, 0), (width, 0), (0, height), (width, height)):
+            x = geotransform[0] + pixel * geotransform[1] + line * geotransform[2]
+            y = geotransform[3] + pixel * geotransform[4] + line * geotransform[5]
+            lon, lat, _ = transform.TransformPoint(x, y)
+            corners.append((lon, lat))
+
+        lons = [corner[0] for corner in corners]
+        lats = [corner[1] for corner in corners]
+        return [min(lons), min(lats), max(lons), max(lats)]
+    except Exception as e:
+        print(f"Error transforming extent to WGS84: {e}")
+        return None
+
+
+def get_epsg_code(projection_wkt: str) -> Optional[int]:
+    """EPSG code of a WKT projection, if it has one"""
+    if not projection_wkt or not projection_wkt.strip():
+        return None
+
+    try:
+        spatial_ref = osr.SpatialReference()
+        spatial_ref.ImportFromWkt(projection_wkt)
+        code = spatial_ref.GetAuthorityCode(None)
+        return int(code) if code else None
+    except Exception:
+        return None
+
+
 def analyze_raster_file(file_path: str) -> Dict[str, Any]:
     """
     Analyze a raster file with GDAL to get georeferencing info and image metadata
     
+    The result is persisted on RawFile/GeoRasterFile (see models.RasterInfoMixin)
+    so the file does not have to be reopened later.
+    
     Returns:
         Dict with keys: gdal_compatible, is_georeferenced, width, height, bands, 
-        has_projection, has_geotransform, error (if any)
+        has_projection, has_geotransform, data_type, geotransform, projection_wkt,
+        epsg_code, wgs84_bounds, is_cog, error (if any)
     """
     try:
         src_ds = gdal.Open(file_path)
@@ -35,6 +132,9 @@ def analyze_raster_file(file_path: str) -> Dict[str, Any]:
         projection = src_ds.GetProjection()
         geotransform = src_ds.GetGeoTransform()
         
+        data_type = gdal.GetDataTypeName(src_ds.GetRasterBand(1).DataType) if bands else None
+        is_cog = src_ds.GetMetadataItem('LAYOUT', 'IMAGE_STRUCTURE') == 'COG'
+        
         # Check if already georeferenced
         has_projection = bool(projection and projection.strip())
         has_geotransform = bool(geotransform and geotransform != (0.0, 1.0, 0.0, 0.0, 0.0, 1.0))
@@ -49,7 +149,13 @@ def analyze_raster_file(file_path: str) -> Dict[str, Any]:
             "height": height,
             "bands": bands,
             "has_projection": has_projection,
-            "has_geotransform": has_geotransform
+            "has_geotransform": has_geotransform,
+            "data_type": data_type,
+            "geotransform": list(geotransform) if geotransform else None,
+            "projection_wkt": projection if has_projection else None,
+            "epsg_code": get_epsg_code(projection),
+            "wgs84_bounds": get_wgs84_bounds(geotransform, width, height, projection) if has_geotransform else None,
+            "is_cog": is_cog
         }
         
     except Exception as e:
@@ -60,7 +166,8 @@ def analyze_raster_file(file_path: str) -> Dict[str, Any]:
         }
 
 
-def create_dummy_georeferenced_file(original_file_path: str, upload_dir: str, dpi: int = 300, progress_callback=None) -> str:
+def create_dummy_georeferenced_file(original_file_path: str, upload_dir: str, dpi: int = 300, progress_callback=None,
+                                    output_dir: Optional[str] = None) -> str:
     """Create a dummy georeferenced GeoTIFF for MapServer compatibility
     
     Args:
@@ -70,6 +177,7 @@ def create_dummy_georeferenced_file(original_file_path: str, upload_dir: str, dp
         progress_callback: Optional callback function that receives progress updates.
                           Function signature: callback(progress: float, message: str)
                           where progress is 0.0 to 1.0 and message is a status string.
+        output_dir: Directory for the georeferenced file (default: next to the original)
     """
     
     # Set GDAL PDF DPI configuration option
@@ -81,9 +189,8 @@ def create_dummy_georeferenced_file(original_file_path: str, upload_dir: str, dp
     base_name = os.path.splitext(os.path.basename(original_file_path))[0]
     georef_filename = f"{base_name}_georef_{uuid.uuid4().hex[:8]}.tif"
     
-    # Place the georeferenced file in the same directory as the original file
-    original_dir = os.path.dirname(original_file_path)
-    georef_path = os.path.join(original_dir, georef_filename)
+    # Place the georeferenced file in the same directory as the original file by default
+    georef_path = os.path.join(output_dir or os.path.dirname(original_file_path), georef_filename)
     
 
     # Open the original file
@@ -148,20 +255,34 @@ def create_dummy_georeferenced_file(original_file_path: str, upload_dir: str, dp
                 progress_callback(progress, message or "Processing...")
             return 1  # Return 1 to continue, 0 to cancel
         
+        use_cog = use_cog_output()
+        if use_cog:
+            # The COG driver writes the file in a single pass, so the georeferencing
+            # has to be assigned up front instead of patched in afterwards
+            format_options = {
+                'format': 'COG',
+                'creationOptions': get_cog_creation_options(),
+                'outputBounds': [x_min, y_max, x_max, y_min],
+            }
+        else:
+            format_options = {
+                'format': 'GTiff',
+                'creationOptions': [
+                    'COMPRESS=LZW', 
+                    'TILED=YES',
+                    'INTERLEAVE=PIXEL',
+                    'BLOCKXSIZE=256',
+                    'BLOCKYSIZE=256',
+                    'NUM_THREADS=8',
+                    'ZLEVEL=1',
+                    'BIGTIFF=IF_SAFER'
+                ],
+            }
+        
         # Use GDAL's built-in Translate method for memory-efficient conversion
         # This avoids loading entire bands into memory
         translate_options = gdal.TranslateOptions(
-            format='GTiff',
-            creationOptions=[
-                'COMPRESS=LZW', 
-                'TILED=YES',
-                'INTERLEAVE=PIXEL',
-                'BLOCKXSIZE=256',
-                'BLOCKYSIZE=256',
-                'NUM_THREADS=8',
-                'ZLEVEL=1',
-                'BIGTIFF=IF_SAFER'
-            ],
+            **format_options,
             # Preserve all bands and data type
             bandList=list(range(1, bands + 1)),
             outputType=data_type,
@@ -184,18 +305,19 @@ def create_dummy_georeferenced_file(original_file_path: str, upload_dir: str, dp
         if progress_callback:
             progress_callback(0.8, "Applying georeferencing parameters...")
         
-        # Apply the custom geotransform
-        temp_ds.SetGeoTransform(geotransform)
-        
-        # Copy band metadata (no-data values, etc.)
-        for band_idx in range(1, bands + 1):
-            src_band = src_ds.GetRasterBand(band_idx)
-            dst_band = temp_ds.GetRasterBand(band_idx)
+        if not use_cog:
+            # Apply the custom geotransform
+            temp_ds.SetGeoTransform(geotransform)
             
-            # Copy no-data value
-            no_data_value = src_band.GetNoDataValue()
-            if no_data_value is not None:
-                dst_band.SetNoDataValue(no_data_value)
+            # Copy band metadata (no-data values, etc.)
+            for band_idx in range(1, bands + 1):
+                src_band = src_ds.GetRasterBand(band_idx)
+                dst_band = temp_ds.GetRasterBand(band_idx)
+                
+                # Copy no-data value
+                no_data_value = src_band.GetNoDataValue()
+                if no_data_value is not None:
+                    dst_band.SetNoDataValue(no_data_value)
         
         print(f"Set projection on dummy georeferenced file: EPSG:3857")
         
@@ -228,3 +350,92 @@ def create_dummy_georeferenced_file(original_file_path: str, upload_dir: str, dp
         return original_file_path
     finally:
         gdal.SetConfigOption('GDAL_PDF_DPI', None)
+
+
+def get_overview_levels(width: int, height: int, min_size: int = OVERVIEW_MIN_SIZE) -> List[int]:
+    """Compute power-of-two overview factors until the smallest level fits in one tile"""
+    levels = []
+    factor = 2
+    while max(width, height) / factor >= min_size:
+        levels.append(factor)
+        factor *= 2
+    # Always build at least one level for rasters just above the tile size
+    if not levels and max(width, height) > min_size:
+        levels.append(2)
+    return levels
+
+
+def has_overviews(file_path: str) -> bool:
+    """Check whether the first band of a raster already has overviews"""
+    try:
+        ds = gdal.Open(str(file_path))
+        if ds is None:
+            return False
+        return ds.GetRasterBand(1).GetOverviewCount() > 0
+    except Exception:
+        return False
+
+
+def build_overviews(file_path: str, resampling: Optional[str] = None, levels: Optional[List[int]] = None,
+                    progress_callback=None) -> List[int]:
+    """Build internal overviews for a GeoTIFF so low zoom reads don't touch full resolution data
+    
+    Args:
+        file_path: Path to the GeoTIFF to update in place
+        resampling: GDAL resampling method (default: OVERVIEW_RESAMPLING)
+        levels: Decimation factors, e.g. [2, 4, 8] (default: OVERVIEW_LEVELS or automatic)
+        progress_callback: Optional callback function that receives progress updates.
+                          Function signature: callback(progress: float, message: str)
+                          where progress is 0.0 to 1.0 and message is a status string.
+    
+    Returns:
+        List of overview factors that were built (empty if nothing was built)
+    """
+    resampling = (resampling or OVERVIEW_RESAMPLING).upper()
+
+    if is_cloud_optimized(file_path):
+        # COGs carry their own overviews, rewriting them in place would break the layout
+        print(f"Skipping overviews for Cloud-Optimized GeoTIFF: {file_path}")
+        return []
+
+    try:
+        ds = gdal.OpenEx(str(file_path), gdal.OF_RASTER | gdal.OF_UPDATE)
+        if ds is None:
+            print(f"Cannot open {file_path} for overview generation")
+            return []
+
+        if ds.GetDriver().ShortName != "GTiff":
+            print(f"Skipping overviews for non-GeoTIFF file: {file_path}")
+            return []
+
+        levels = levels or OVERVIEW_LEVELS or get_overview_levels(ds.RasterXSize, ds.RasterYSize)
+        if not levels:
+            return []
+
+        def gdal_progress_callback(progress, message, data):
+            """GDAL progress callback that forwards to user callback"""
+            if progress_callback:
+                progress_callback(progress, message or "Building overviews...")
+            return 1  # Return 1 to continue, 0 to cancel
+
+        if progress_callback:
+            progress_callback(0.0, f"Building overviews {levels} ({resampling})...")
+
+        ds.BuildOverviews(
+            resampling,
+            levels,
+            callback=gdal_progress_callback,
+            options=['COMPRESS_OVERVIEW=LZW', 'NUM_THREADS=ALL_CPUS'],
+        )
+        ds.FlushCache()
+        ds = None
+
+        if progress_callback:
+            progress_callback(1.0, "Overviews built successfully")
+
+        return levels
+
+    except Exception as e:
+        # Overviews are an optimization, a failure must not break the pipeline
+        print(f"Failed to build overviews for {file_path}: {e}")
+        return []
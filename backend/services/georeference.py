@@ -12,6 +12,8 @@ from osgeo import gdal, osr
 from dataclasses import dataclass
 import math
 
+from .geo import use_cog_output, get_cog_creation_options
+
 gdal.UseExceptions()
 
 
@@ -100,7 +102,8 @@ def calculate_transform_from_control_points(control_points: List[ControlPoint])
 
 def warp_image_with_control_points(input_path: str, 
                                  control_points: List[ControlPoint],
-                                 control_points_srs: str = "EPSG:4326") -> str:
+                                 control_points_srs: str = "EPSG:4326",
+                                 output_dir: Optional[str] = None) -> str:
     """
     Warp an image using control points
     
@@ -108,6 +111,7 @@ def warp_image_with_control_points(input_path: str,
         input_path: Path to input image
         control_points: List of control points
         control_points_srs: Target spatial reference system
+        output_dir: Directory for the warped image (default: next to the input)
         
     Returns:
         str: Path to warped image
@@ -120,7 +124,7 @@ def warp_image_with_control_points(input_path: str,
     if not input_file.exists():
         raise ValueError("Input file does not exist")
 
-    output_path = input_file.parent / f"warped_{uuid.uuid4().hex[:8]}.{input_file.suffix}"
+    output_path = Path(output_dir or input_file.parent) / f"warped_{uuid.uuid4().hex[:8]}.{input_file.suffix}"
     
     # Open input dataset
     src_ds = gdal.Open(input_path)
@@ -186,14 +190,12 @@ def warp_image_with_control_points(input_path: str,
         outputSRS='EPSG:4326'
     )
     
-    # Create warping options with transparency support
-    warp_options = gdal.WarpOptions(
-        format='GTiff',
-        dstSRS='EPSG:3857',
-        resampleAlg=gdal.GRA_Bilinear,
-        errorThreshold=0.125,
-        dstAlpha=True,  # Add alpha band for transparency
-        creationOptions=[
+    if use_cog_output():
+        output_format = 'COG'
+        creation_options = get_cog_creation_options()
+    else:
+        output_format = 'GTiff'
+        creation_options = [
             'COMPRESS=LZW', 
             'TILED=YES',
             'interleave=pixel',
@@ -204,6 +206,15 @@ def warp_image_with_control_points(input_path: str,
             'BIGTIFF=IF_SAFER',
             'PHOTOMETRIC=RGB',  # Ensure proper color interpretation
         ]
+    
+    # Create warping options with transparency support
+    warp_options = gdal.WarpOptions(
+        format=output_format,
+        dstSRS='EPSG:3857',
+        resampleAlg=gdal.GRA_Bilinear,
+        errorThreshold=0.125,
+        dstAlpha=True,  # Add alpha band for transparency
+        creationOptions=creation_options
     )
     
     # Perform warping
@@ -0,0 +1,170 @@
+"""
+Process-local cache of resolved file metadata for the tile/extent hot paths
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from models import TreeItem
+
+# Redis channel used to tell every API process that cached metadata is stale
+INVALIDATION_CHANNEL = "file_metadata_invalidation"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+@dataclass
+class FileMetadata:
+    """Everything the tile, map and extent endpoints need to know about a file"""
+    tree_item_id: str
+    object_type: str
+    object_id: str
+    file_path: str
+    map_config_path: Optional[str] = None
+    is_cog: bool = False
+    extent: Optional[str] = None  # WGS84 "min_x,min_y,max_x,max_y"
+    projection: Optional[str] = None  # MapServer projection string, filled lazily
+    # Permission fields of the tree item, checked through permission_item()
+    owner_user_id: Optional[uuid.UUID] = None
+    owner_group_id: Optional[uuid.UUID] = None
+    permissions: int = 0o644
+
+    def permission_item(self) -> TreeItem:
+        """Unsaved TreeItem with the cached permission fields, for require_permission without a query"""
+        return TreeItem(
+            id=self.tree_item_id,
+            object_type=self.object_type,
+            object_id=self.object_id,
+            owner_user_id=self.owner_user_id,
+            owner_group_id=self.owner_group_id,
+            permissions=self.permissions,
+        )
+
+
+class FileMetadataCache:
+    """Bounded TTL/LRU cache of FileMetadata keyed by tree item id.
+
+    Entries are evicted explicitly through invalidate() whenever a tree item or
+    the object behind it changes. Other processes (Celery workers, other API
+    workers) reach every cache through publish_invalidation(); the TTL only
+    bounds staleness if such a message is lost.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or int(os.getenv("FILE_METADATA_CACHE_SIZE", "10000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("FILE_METADATA_CACHE_TTL", "300"))
+        self._entries: "OrderedDict[str, Tuple[FileMetadata, float]]" = OrderedDict()
+        # Bumped on every invalidation so in-flight loads don't store stale data
+        self._generation = 0
+
+    def get(self, tree_item_id: str) -> Optional[FileMetadata]:
+        """Return cached metadata, or None if missing or expired"""
+        entry = self._entries.get(str(tree_item_id))
+        if entry is None:
+            return None
+        metadata, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            self._entries.pop(str(tree_item_id), None)
+            return None
+        self._entries.move_to_end(str(tree_item_id))
+        return metadata
+
+    def put(self, metadata: FileMetadata):
+        self._entries[metadata.tree_item_id] = (metadata, time.monotonic())
+        self._entries.move_to_end(metadata.tree_item_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, item_id: str) -> int:
+        """Evict entries for a tree item id or for the object id behind it. Returns the number evicted."""
+        item_id = str(item_id)
+        self._generation += 1
+        stale = [
+            key for key, (metadata, _) in self._entries.items()
+            if key == item_id or metadata.object_id == item_id
+        ]
+        for key in stale:
+            self._entries.pop(key, None)
+        return len(stale)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+
+    async def load(self, tree_item_id: str) -> Optional[FileMetadata]:
+        """Get metadata for a file tree item, querying the database on a miss"""
+        cached = self.get(tree_item_id)
+        if cached is not None:
+            return cached
+
+        generation = self._generation
+        tree_item = await TreeItem.get_or_none(id=tree_item_id, object_type__in=["raw_file", "geo_raster_file"])
+        if not tree_item:
+            return None
+        obj = await tree_item.get_object()
+
+        metadata = FileMetadata(
+            tree_item_id=str(tree_item.id),
+            object_type=tree_item.object_type,
+            object_id=str(obj.id),
+            file_path=str(obj.file_path),
+            map_config_path=getattr(obj, "map_config_path", None),
+            is_cog=getattr(obj, "is_cog", False),
+            extent=obj.get_wgs84_extent(),
+            owner_user_id=tree_item.owner_user_id,
+            owner_group_id=tree_item.owner_group_id,
+            permissions=tree_item.permissions,
+        )
+        if generation == self._generation:
+            self.put(metadata)
+        return metadata
+
+
+def publish_invalidation(*item_ids):
+    """Tell every process holding a FileMetadataCache to drop these tree item/object ids
+
+    Synchronous so it can be called from Celery tasks; failures are logged and
+    otherwise ignored, the cache TTL bounds staleness.
+    """
+    try:
+        client = redis.Redis.from_url(REDIS_URL)
+        try:
+            for item_id in item_ids:
+                client.publish(INVALIDATION_CHANNEL, str(item_id))
+        finally:
+            client.close()
+    except Exception as e:
+        print(f"Failed to publish metadata invalidation for {item_ids}: {e}")
+
+
+async def listen_for_invalidations(cache: FileMetadataCache):
+    """Apply invalidations published by other processes until cancelled"""
+    while True:
+        client = aioredis.from_url(REDIS_URL)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = message["data"]
+                cache.invalidate(data.decode() if isinstance(data, bytes) else data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Metadata invalidation listener failed, retrying: {e}")
+            # Messages may have been missed while disconnected
+            cache.clear()
+            await asyncio.sleep(5)
+        finally:
+            try:
+                await pubsub.close()
+                await client.close()
+            except Exception:
+                pass
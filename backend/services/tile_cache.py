@@ -0,0 +1,141 @@
+"""
+On-disk XYZ tile cache shared by the API workers and the Celery workers
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Optional
+
+import aiofiles
+
+
+class TileCache:
+    """Persistent tile cache keyed by (geo_raster_file id, file version, z, x, y).
+
+    Tiles live under ``<cache_dir>/<geo_raster_file_id>/<version>/<z>/<x>/<y>.png``
+    where ``version`` is derived from the current ``GeoRasterFile.file_path``, so
+    swapping the file (warp or reset) never serves stale tiles. The total size is
+    kept under ``max_bytes`` by evicting the least recently used tiles (file mtime
+    is bumped on every hit).
+    """
+
+    # Fraction of the budget to shrink to once eviction kicks in
+    EVICT_TARGET_RATIO = 0.9
+
+    def __init__(self, cache_dir=None, max_bytes=None, enabled=None):
+        self.cache_dir = cache_dir or os.getenv("TILE_CACHE_DIR", os.path.join("uploads", "tile_cache"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("TILE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+        if enabled is None:
+            enabled = os.getenv("TILE_CACHE_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+
+        self._current_bytes: Optional[int] = None
+        self._evicting = False
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_version(file_path: str) -> str:
+        """Short version token for the file currently backing a GeoRasterFile"""
+        return hashlib.sha1(str(file_path).encode()).hexdigest()[:12]
+
+    def _tile_path(self, geo_raster_file_id: str, version: str, z: int, x: int, y: int) -> str:
+        return os.path.join(self.cache_dir, str(geo_raster_file_id), version, str(z), str(x), f"{y}.png")
+
+    # ----------------------
+    # Tile access
+    # ----------------------
+
+    async def get(self, geo_raster_file_id: str, version: str, z: int, x: int, y: int) -> Optional[bytes]:
+        """Read a cached tile, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        tile_path = self._tile_path(geo_raster_file_id, version, z, x, y)
+        try:
+            async with aiofiles.open(tile_path, 'rb') as f:
+                content = await f.read()
+        except FileNotFoundError:
+            return None
+
+        # Mark as recently used for LRU eviction
+        try:
+            os.utime(tile_path, None)
+        except OSError:
+            pass
+        return content
+
+    async def put(self, geo_raster_file_id: str, version: str, z: int, x: int, y: int, content: bytes):
+        """Store a tile and evict old tiles if the size budget is exceeded"""
+        if not self.enabled:
+            return
+
+        tile_path = self._tile_path(geo_raster_file_id, version, z, x, y)
+        os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+
+        # Write to a temp file and rename so readers never see partial tiles
+        tmp_path = f"{tile_path}.{uuid.uuid4().hex[:8]}.tmp"
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(content)
+        os.replace(tmp_path, tile_path)
+
+        if self._current_bytes is None:
+            self._current_bytes = await asyncio.to_thread(self._scan_size)
+        self._current_bytes += len(content)
+
+        if self._current_bytes > self.max_bytes and not self._evicting:
+            self._evicting = True
+            try:
+                self._current_bytes = await asyncio.to_thread(self._evict)
+            finally:
+                self._evicting = False
+
+    # ----------------------
+    # Invalidation and eviction
+    # ----------------------
+
+    def invalidate(self, geo_raster_file_id: str):
+        """Drop every cached tile of a GeoRasterFile (called when its file is swapped)"""
+        if not self.enabled:
+            return
+        shutil.rmtree(os.path.join(self.cache_dir, str(geo_raster_file_id)), ignore_errors=True)
+        # Force a rescan on the next write
+        self._current_bytes = None
+
+    def _iter_tiles(self):
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _path, size, _mtime in self._iter_tiles())
+
+    def _evict(self) -> int:
+        """Delete least recently used tiles until the cache fits the budget. Returns the new size."""
+        tiles = sorted(self._iter_tiles(), key=lambda tile: tile[2])
+        total = sum(size for _path, size, _mtime in tiles)
+        target = int(self.max_bytes * self.EVICT_TARGET_RATIO)
+
+        for path, size, _mtime in tiles:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                total -= size
+            except OSError as e:
+                print(f"Failed to evict cached tile {path}: {e}")
+
+        print(f"Tile cache eviction finished, size is now {total} bytes")
+        return total
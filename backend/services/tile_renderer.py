@@ -0,0 +1,144 @@
+"""
+In-process XYZ tile renderer that reads GeoTIFFs directly with GDAL
+"""
+import asyncio
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from osgeo import gdal
+
+
+class TileRenderer:
+    """Render 256x256 EPSG:3857 PNG tiles straight from a raster file.
+
+    Each tile is produced by a warped VRT read (GDAL picks the best overview
+    level on its own) followed by a PNG encode into /vsimem. Rendering runs in
+    a thread pool so the event loop is never blocked; GDAL releases the GIL
+    during I/O and warping.
+    """
+
+    TILE_SIZE = 256
+    # Files whose value range is remembered for scaling non-Byte data
+    SCALE_CACHE_SIZE = 1024
+
+    def __init__(self, max_workers=None, resampling=None):
+        self.max_workers = max_workers or int(os.getenv("TILE_RENDER_WORKERS", str(os.cpu_count() or 4)))
+        self.resampling = resampling or os.getenv("TILE_RENDER_RESAMPLING", "bilinear")
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._scale_cache: Dict[Tuple[str, float], List[List[float]]] = {}
+        self._scale_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tile-render")
+        return self._executor
+
+    async def render(self, file_path: str, bbox: Tuple[float, float, float, float]) -> Optional[bytes]:
+        """Render the tile covering an EPSG:3857 bbox, returns PNG bytes or None on failure"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.render_sync, file_path, bbox)
+
+    def render_sync(self, file_path: str, bbox: Tuple[float, float, float, float]) -> Optional[bytes]:
+        """Blocking tile render, safe to call from worker threads"""
+        vsimem_path = f"/vsimem/tile_{uuid.uuid4().hex}.png"
+        try:
+            src_ds = gdal.Open(str(file_path))
+            if src_ds is None:
+                print(f"Tile renderer could not open {file_path}")
+                return None
+
+            # Add an alpha band only if the source does not carry one already
+            last_band = src_ds.GetRasterBand(src_ds.RasterCount)
+            has_alpha = last_band.GetColorInterpretation() == gdal.GCI_AlphaBand
+            is_byte = src_ds.GetRasterBand(1).DataType == gdal.GDT_Byte
+
+            warped_vrt = gdal.Warp(
+                "",
+                src_ds,
+                format="VRT",
+                dstSRS="EPSG:3857",
+                outputBounds=bbox,
+                width=self.TILE_SIZE,
+                height=self.TILE_SIZE,
+                resampleAlg=self.resampling,
+                dstAlpha=not has_alpha,
+                # Fixed alpha range so it can be scaled like a Byte band
+                warpOptions=["DST_ALPHA_MAX=255"],
+            )
+            if warped_vrt is None:
+                return None
+
+            translate_kwargs = {"format": "PNG"}
+            if not is_byte:
+                # PNG tiles are 8-bit, stretch other data types to the byte range. The range
+                # comes from the whole file, so adjacent tiles get the same contrast.
+                scale_params = self._get_scale_params(file_path, src_ds)
+                if not has_alpha:
+                    scale_params = scale_params + [[0, 255, 0, 255]]
+                translate_kwargs["outputType"] = gdal.GDT_Byte
+                translate_kwargs["scaleParams"] = scale_params
+
+            png_ds = gdal.Translate(vsimem_path, warped_vrt, **translate_kwargs)
+            if png_ds is None:
+                return None
+            png_ds = None
+            warped_vrt = None
+            src_ds = None
+
+            return self._read_vsimem(vsimem_path)
+
+        except Exception as e:
+            print(f"Error rendering tile from {file_path}: {e}")
+            return None
+        finally:
+            # PNG cannot hold georeferencing, so GDAL may also write a .aux.xml sidecar
+            for path in (vsimem_path, f"{vsimem_path}.aux.xml"):
+                if gdal.VSIStatL(path) is not None:
+                    gdal.Unlink(path)
+
+    def _get_scale_params(self, file_path: str, src_ds) -> List[List[float]]:
+        """Per band [min, max, 0, 255] scaling of a file, computed once from its overviews"""
+        key = (str(file_path), os.path.getmtime(file_path))
+        with self._scale_lock:
+            scale_params = self._scale_cache.get(key)
+        if scale_params is not None:
+            return scale_params
+
+        scale_params = []
+        for band_number in range(1, src_ds.RasterCount + 1):
+            band = src_ds.GetRasterBand(band_number)
+            if band.GetColorInterpretation() == gdal.GCI_AlphaBand:
+                scale_params.append([0, 255, 0, 255])
+                continue
+            minimum, maximum = band.ComputeRasterMinMax(True)
+            if maximum <= minimum:
+                maximum = minimum + 1
+            scale_params.append([minimum, maximum, 0, 255])
+
+        with self._scale_lock:
+            if len(self._scale_cache) >= self.SCALE_CACHE_SIZE:
+                self._scale_cache.clear()
+            self._scale_cache[key] = scale_params
+        return scale_params
+
+    @staticmethod
+    def _read_vsimem(path: str) -> Optional[bytes]:
+        stat = gdal.VSIStatL(path)
+        if stat is None:
+            return None
+        handle = gdal.VSIFOpenL(path, "rb")
+        if handle is None:
+            return None
+        try:
+            return gdal.VSIFReadL(1, stat.size, handle)
+        finally:
+            gdal.VSIFCloseL(handle)
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -11,8 +11,11 @@ from .common import init_database, close_database
 
 
 from mapserver_service import MapServerService
+from services.tile_cache import TileCache
+from services.metadata_cache import publish_invalidation
 
 mapserver = MapServerService()
+tile_cache = TileCache()
 
 
 @celery_app.task(bind=True, name="tasks.convert_to_geo_raster_task")
@@ -141,7 +144,8 @@ async def _convert_to_geo_raster_async(tree_item_id: str, upload_dir: str, task_
         # Update TreeItem to point to GeoRasterFile
         tree_item.object_type = "geo_raster_file"
         tree_item.object_id = geo_raster_file_obj.id
-        await tree_item.save()
+        await tree_item.save(update_fields=["object_type", "object_id", "updated_at"])
+        publish_invalidation(tree_item_id)
         
         # Update progress
         task_instance.update_state(
@@ -227,7 +231,8 @@ async def _apply_georeferencing_async(tree_item_id: str, control_points_data: li
     try:
         # Import required modules after database initialization
         from models import TreeItem, GeoRasterFile
-        from services import georeference
+        from services import georeference, build_overviews, analyze_raster_file
+        from services.files import FileService
         import os
         
         # Update progress
@@ -277,9 +282,26 @@ async def _apply_georeferencing_async(tree_item_id: str, control_points_data: li
         georeferenced_path = georeference.warp_image_with_control_points(
             file_path,
             control_points,
-            control_points_srs
+            control_points_srs,
+            output_dir=FileService.get_derived_file_dir(file_path)
         )
         
+        # Update progress
+        task_instance.update_state(
+            state="PROGRESS",
+            meta={"status": "Building overviews", "progress": 55}
+        )
+        
+        def overviews_progress_callback(progress, message):
+            # Map overview progress (0.0-1.0) to task progress (55-70)
+            task_progress = 55 + int(progress * 15)
+            task_instance.update_state(
+                state="PROGRESS",
+                meta={"status": message, "progress": task_progress}
+            )
+        
+        build_overviews(georeferenced_path, progress_callback=overviews_progress_callback)
+        
         # Update progress
         task_instance.update_state(
             state="PROGRESS",
@@ -290,10 +312,13 @@ async def _apply_georeferencing_async(tree_item_id: str, control_points_data: li
         old_file_path = file_path
         
         # Regenerate map config to clear cache on mapserver
-        map_config_path = mapserver._create_map_config(georeferenced_path)
+        analysis = analyze_raster_file(georeferenced_path)
+        map_config_path = mapserver._create_map_config(georeferenced_path, raster_info=analysis)
         geo_raster_file.map_config_path = map_config_path
         geo_raster_file.file_path = georeferenced_path
         geo_raster_file.is_georeferenced = True
+        geo_raster_file.is_cog = analysis.get("is_cog", False)
+        geo_raster_file.set_raster_info(analysis)
         
         # Update progress
         task_instance.update_state(
@@ -303,8 +328,13 @@ async def _apply_georeferencing_async(tree_item_id: str, control_points_data: li
         
         await geo_raster_file.save()
         
-        # Clean up old file if it's different from the original
-        if os.path.exists(old_file_path) and old_file_path != geo_raster_file.original_file_path:
+        # Cached tiles and metadata describe the previous file
+        tile_cache.invalidate(geo_raster_file.id)
+        publish_invalidation(str(geo_raster_file.id))
+        
+        # Clean up old file if it's different from the original and was not registered in place
+        if (os.path.exists(old_file_path) and old_file_path != geo_raster_file.original_file_path
+                and FileService.is_managed_path(old_file_path)):
             os.remove(old_file_path)
         
         # Update progress
@@ -322,3 +352,97 @@ async def _apply_georeferencing_async(tree_item_id: str, control_points_data: li
         
     finally:
         await close_database()
+
+
+@celery_app.task(bind=True, name="tasks.ingest_file_task")
+def ingest_file_task(self, tree_item_id: str) -> Dict[str, Any]:
+    """
+    Background task to analyze an uploaded file and register it as RawFile or GeoRasterFile
+    
+    Args:
+        tree_item_id: UUID string of the TreeItem created for the upload
+        
+    Returns:
+        Dict with task result information
+    """
+    try:
+        # Update task status
+        self.update_state(
+            state="PROGRESS",
+            meta={"status": "Starting ingest", "progress": 0}
+        )
+        
+        # Run the async ingest in an event loop
+        result = asyncio.run(_ingest_file_async(tree_item_id, self))
+        
+        return {
+            "status": "SUCCESS",
+            "tree_item_id": tree_item_id,
+            "result": result
+        }
+        
+    except Exception as exc:
+        # Log the error for debugging
+        import traceback
+        error_traceback = traceback.format_exc()
+        print(f"Ingest task failed with error: {str(exc)}")
+        print(f"Traceback: {error_traceback}")
+        
+        # Update task state with error
+        self.update_state(
+            state="FAILURE",
+            meta={
+                "status": "FAILED",
+                "error": str(exc),
+                "tree_item_id": tree_item_id,
+                "traceback": error_traceback
+            }
+        )
+        raise
+
+
+async def _ingest_file_async(tree_item_id: str, task_instance) -> Dict[str, Any]:
+    """
+    Async implementation of the file ingest
+    
+    Args:
+        tree_item_id: UUID string of the TreeItem created for the upload
+        task_instance: Celery task instance for progress updates
+        
+    Returns:
+        Dict with ingest result
+    """
+    await init_database()
+    
+    try:
+        # Import required modules after database initialization
+        from models import TreeItem
+        from models_factory import ingest_raw_file
+        
+        tree_item = await TreeItem.get_or_none(id=tree_item_id)
+        if not tree_item:
+            raise ValueError(f"TreeItem with id {tree_item_id} not found")
+        
+        # Update progress
+        task_instance.update_state(
+            state="PROGRESS",
+            meta={"status": "Analyzing file", "progress": 20}
+        )
+        
+        tree_item = await ingest_raw_file(tree_item)
+        publish_invalidation(tree_item_id)
+        
+        # Update progress
+        task_instance.update_state(
+            state="PROGRESS",
+            meta={"status": "Ingest complete", "progress": 100}
+        )
+        
+        return {
+            "tree_item_id": tree_item_id,
+            "object_type": tree_item.object_type,
+            "object_id": str(tree_item.object_id)
+        }
+        
+    finally:
+        await close_database()
@@ -0,0 +1,88 @@
+"""
+Upload maintenance background tasks
+"""
+import asyncio
+import os
+from typing import Dict, Any
+
+from celery_app import celery_app
+from .common import init_database, close_database
+
+
+# Expired upload sessions deleted per query, every batch is a short transaction
+UPLOAD_CLEANUP_BATCH_SIZE = int(os.getenv("UPLOAD_CLEANUP_BATCH_SIZE", "100"))
+
+
+@celery_app.task(bind=True, name="tasks.cleanup_expired_uploads")
+def cleanup_expired_uploads_task(self, batch_size: int = UPLOAD_CLEANUP_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Periodic task that removes expired chunked upload sessions and their temp directories
+
+    Args:
+        batch_size: Number of sessions deleted per batch
+
+    Returns:
+        Dict with the number of removed sessions and reclaimed bytes
+    """
+    result = asyncio.run(_cleanup_expired_uploads_async(batch_size))
+    print(
+        f"Upload cleanup removed {result['sessions_removed']} expired sessions, "
+        f"reclaimed {result['bytes_reclaimed']} bytes"
+    )
+    return result
+
+
+async def _cleanup_expired_uploads_async(batch_size: int) -> Dict[str, Any]:
+    """
+    Async implementation of the expired upload cleanup
+
+    Sessions are claimed and deleted in one statement per batch using the
+    expires_at index, so the sweep never scans live sessions. Rows locked by a
+    concurrent /files/chunked/complete are skipped and picked up next time.
+    """
+    await init_database()
+
+    try:
+        from tortoise import connections
+        from services.files import FileService
+
+        connection = connections.get("default")
+        temp_root = os.path.realpath(os.path.join(FileService.UPLOAD_DIR, "temp"))
+        sessions_removed = 0
+        bytes_reclaimed = 0
+
+        while True:
+            rows = await connection.execute_query_dict(
+                """
+                DELETE FROM chunked_upload_sessions
+                WHERE id IN (
+                    SELECT id FROM chunked_upload_sessions
+                    WHERE expires_at < NOW()
+                    ORDER BY expires_at
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING upload_id, temp_dir
+                """,
+                [batch_size]
+            )
+
+            for row in rows:
+                temp_dir = os.path.realpath(row["temp_dir"])
+                # Never follow a stored path outside of the upload temp directory
+                if os.path.dirname(temp_dir) != temp_root:
+                    print(f"Skipping temp dir outside of {temp_root} for upload {row['upload_id']}: {temp_dir}")
+                    continue
+                bytes_reclaimed += FileService.remove_upload_dir(temp_dir)
+
+            sessions_removed += len(rows)
+            if len(rows) < batch_size:
+                break
+
+        return {
+            "sessions_removed": sessions_removed,
+            "bytes_reclaimed": bytes_reclaimed
+        }
+
+    finally:
+        await close_database()
@@ -0,0 +1,93 @@
+"""
+Chunk bookkeeping of ChunkedUploadSession and the composite upload checksum
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import ChunkedUploadSession, User
+from services.files import FileService
+
+
+async def create_session(total_chunks: int = 4) -> ChunkedUploadSession:
+    user = User(username="uploader", email="uploader@example.com")
+    user.set_password("password")
+    await user.save()
+    return await ChunkedUploadSession.create(
+        upload_id="test-upload",
+        user=user,
+        filename="map.tif",
+        file_size=total_chunks * 10,
+        chunk_size=10,
+        total_chunks=total_chunks,
+        temp_dir="/tmp/test-upload",
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    )
+
+
+@pytest.mark.parametrize("received, expected", [
+    ([], [[0, 5]]),
+    ([0, 1, 2, 3, 4, 5], []),
+    ([0, 5], [[1, 4]]),
+    ([1, 2, 4], [[0, 0], [3, 3], [5, 5]]),
+    ([3], [[0, 2], [4, 5]]),
+])
+async def test_missing_ranges(received, expected):
+    session = ChunkedUploadSession(total_chunks=6, chunks_received=received)
+
+    assert session.get_missing_ranges() == expected
+
+
+async def test_composite_checksum():
+    chunks = [b"first chunk", b"second chunk", b"third"]
+    checksums = {str(number): hashlib.sha256(chunk).hexdigest() for number, chunk in enumerate(chunks)}
+
+    expected = hashlib.sha256(b"".join(hashlib.sha256(chunk).digest() for chunk in chunks)).hexdigest()
+
+    assert FileService.composite_checksum(checksums, len(chunks)) == expected
+
+
+async def test_composite_checksum_needs_every_chunk():
+    checksums = {"0": hashlib.sha256(b"a").hexdigest(), "2": hashlib.sha256(b"c").hexdigest()}
+
+    assert FileService.composite_checksum(checksums, 3) is None
+
+
+async def test_record_chunk_is_idempotent():
+    session = await create_session()
+
+    await session.record_chunk(2, "aa")
+    await session.record_chunk(0, "bb")
+    received = await session.record_chunk(2, "cc")
+
+    assert received == 2
+    assert session.chunks_received == [0, 2]
+    # A chunk written again replaces its checksum
+    assert session.chunk_checksums == {"0": "bb", "2": "cc"}
+
+    stored = await ChunkedUploadSession.get(id=session.id)
+    assert sorted(stored.chunks_received) == [0, 2]
+    assert stored.chunk_checksums == {"0": "bb", "2": "cc"}
+
+
+async def test_discard_chunk():
+    session = await create_session()
+    for chunk_number in range(4):
+        await session.record_chunk(chunk_number, f"{chunk_number:02x}")
+    assert session.is_complete()
+
+    received = await session.discard_chunk(1)
+
+    assert received == 3
+    assert session.chunks_received == [0, 2, 3]
+    assert "1" not in session.chunk_checksums
+    assert not session.is_complete()
+    assert session.get_missing_ranges() == [[1, 1]]
+
+    # Discarding a chunk that was never recorded changes nothing
+    assert await session.discard_chunk(1) == 3
+
+    stored = await ChunkedUploadSession.get(id=session.id)
+    assert sorted(stored.chunks_received) == [0, 2, 3]
+    assert stored.chunk_checksums == {"0": "00", "2": "02", "3": "03"}
@@ -0,0 +1,75 @@
+"""
+Pagination cursors and child_count maintenance of CollectionsService
+"""
+import datetime
+import uuid
+
+import pytest
+
+from models import TreeItem, Collection
+from services.collections import CollectionsService, encode_cursor, decode_cursor
+
+
+async def create_root() -> TreeItem:
+    collection = await Collection.create()
+    return await TreeItem.create(
+        name="root",
+        object_type="collection",
+        object_id=collection.id,
+        path="root",
+        parent_path=None,
+    )
+
+
+async def test_cursor_round_trip():
+    item = TreeItem(
+        id=uuid.uuid4(),
+        created_at=datetime.datetime(2026, 10, 17, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    )
+
+    cursor = encode_cursor(item)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (item.created_at, item.id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "eyJjIjogMX0", "eyJjIjogIngiLCAiaSI6ICJ5In0"])
+async def test_decode_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+async def test_child_count_follows_creates_and_deletes():
+    root = await create_root()
+    parent = await CollectionsService.create_collection("parent", {}, parent_path="root")
+    first = await CollectionsService.create_collection("first", {}, parent_path=parent.path)
+    await CollectionsService.create_collection("second", {}, parent_path=parent.path)
+
+    await root.refresh_from_db()
+    await parent.refresh_from_db()
+    assert root.child_count == 1
+    assert parent.child_count == 2
+
+    await CollectionsService.delete_collection(str(first.id))
+
+    await parent.refresh_from_db()
+    assert parent.child_count == 1
+
+
+async def test_force_delete_returns_every_deleted_item():
+    await create_root()
+    parent = await CollectionsService.create_collection("parent", {}, parent_path="root")
+    child = await CollectionsService.create_collection("child", {}, parent_path=parent.path)
+    grandchild = await CollectionsService.create_collection("grandchild", {}, parent_path=child.path)
+
+    with pytest.raises(ValueError):
+        await CollectionsService.delete_collection(str(parent.id))
+
+    deleted = await CollectionsService.delete_collection(str(parent.id), force=True)
+
+    assert {row["id"] for row in deleted} == {parent.id, child.id, grandchild.id}
+    assert not await TreeItem.filter(id__in=[parent.id, child.id, grandchild.id]).exists()
+
+
+async def test_delete_missing_collection_returns_nothing():
+    assert await CollectionsService.delete_collection(str(uuid.uuid4())) == []
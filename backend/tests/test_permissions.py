@@ -0,0 +1,116 @@
+"""
+The SQL read filter of CollectionsService must agree with TreeItem.can_read
+"""
+import uuid
+
+import pytest
+from tortoise import connections
+
+from models import TreeItem, User, Group
+from services.collections import CollectionsService
+
+# Read bits in every combination, with and without the write bits
+PERMISSION_MODES = [0o000, 0o004, 0o040, 0o044, 0o400, 0o404, 0o440, 0o444, 0o600, 0o640, 0o644, 0o664]
+
+
+async def create_user(username: str, is_admin: bool = False) -> User:
+    user = User(username=username, email=f"{username}@example.com", is_admin=is_admin)
+    user.set_password("password")
+    await user.save()
+    return user
+
+
+async def create_item(index: int, permissions: int, owner_user: User = None, owner_group: Group = None) -> TreeItem:
+    return await TreeItem.create(
+        name=f"item-{index}",
+        object_type="collection",
+        object_id=uuid.uuid4(),
+        path=f"root.t{index}",
+        parent_path="root",
+        permissions=permissions,
+        owner_user=owner_user,
+        owner_group=owner_group,
+    )
+
+
+async def readable_ids(user) -> set:
+    """IDs of the tree items the SQL filter lets user read"""
+    clause, params = await CollectionsService._read_permission_clause(user, 1)
+    query = "SELECT id FROM tree_items"
+    if clause:
+        query += f" WHERE {clause}"
+    rows = await connections.get("default").execute_query_dict(query, params)
+    return {row["id"] for row in rows}
+
+
+@pytest.fixture
+async def permission_setup():
+    owner = await create_user("owner")
+    member = await create_user("member")
+    owner_member = await create_user("owner_member")
+    other = await create_user("other")
+    admin = await create_user("admin", is_admin=True)
+
+    group = await Group.create(name="editors")
+    await group.members.add(member, owner_member)
+
+    items = []
+    index = 0
+    for permissions in PERMISSION_MODES:
+        for owner_user in (owner, owner_member, None):
+            for owner_group in (group, None):
+                items.append(await create_item(index, permissions, owner_user, owner_group))
+                index += 1
+
+    users = {
+        "owner": owner,
+        "member": member,
+        "owner_member": owner_member,
+        "other": other,
+        "admin": admin,
+        "anonymous": None,
+    }
+    return users, items
+
+
+@pytest.mark.parametrize("username", ["owner", "member", "owner_member", "other", "admin", "anonymous"])
+async def test_read_filter_matches_can_read(permission_setup, username):
+    users, items = permission_setup
+    user = users[username]
+
+    expected = {item.id for item in items if await item.can_read(user)}
+
+    assert await readable_ids(user) == expected
+
+
+async def test_admin_reads_everything(permission_setup):
+    users, items = permission_setup
+
+    clause, params = await CollectionsService._read_permission_clause(users["admin"], 1)
+
+    assert clause is None
+    assert params == []
+    assert await readable_ids(users["admin"]) == {item.id for item in items}
+
+
+async def test_owner_bits_decide_for_owners_in_the_group(permission_setup):
+    users, items = permission_setup
+    owner_member = users["owner_member"]
+    # Group may read, the owner may not: like Linux, the owner class decides
+    item = next(
+        item for item in items
+        if item.owner_user_id == owner_member.id and item.owner_group_id and item.permissions == 0o040
+    )
+
+    assert not await item.can_read(owner_member)
+    assert item.id not in await readable_ids(owner_member)
+
+
+async def test_placeholders_start_at_param_idx(permission_setup):
+    users, _ = permission_setup
+
+    clause, params = await CollectionsService._read_permission_clause(users["member"], 3)
+
+    assert "$3" in clause and "$4" in clause
+    assert "$1" not in clause
+    assert params[0] == users["member"].id
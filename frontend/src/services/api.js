@@ -2,6 +2,9 @@ import axios from 'axios'
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1'
 
+// Number of chunks of a chunked upload sent concurrently
+const PARALLEL_CHUNK_UPLOADS = 4
+
 class ApiService {
   constructor() {
     this.baseUrl = API_BASE_URL
@@ -212,6 +215,38 @@ class ApiService {
     return response.data
   }
 
+  /**
+   * Upload many files into one collection with a single request
+   * @param {File[]} files - The files to upload
+   * @param {Object} tags - Tags to associate with every file
+   * @param {string} parentPath - The LTREE path where the files should be placed (default: "root")
+   * @param {string[]} uploadIds - Chunked uploads with all chunks sent, to complete in the same request
+   * @param {Object} checksums - Optional checksum per upload ID, verified like on /files/chunked/complete
+   * @returns {Promise<Object>} Per-file results with the created items or errors
+   */
+  async uploadFilesBatch(files, tags = {}, parentPath = "root", uploadIds = [], checksums = {}) {
+    const formData = new FormData()
+    for (const file of files) {
+      formData.append('files', file)
+    }
+    if (uploadIds.length) {
+      formData.append('upload_ids', JSON.stringify(uploadIds))
+    }
+    if (Object.keys(checksums).length) {
+      formData.append('checksums', JSON.stringify(checksums))
+    }
+    formData.append('tags', JSON.stringify(tags))
+    formData.append('parent_path', parentPath)
+
+    const response = await this.axios.post('/files/batch', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data'
+      }
+    })
+
+    return response.data
+  }
+
   /**
    * Upload a file using chunked upload for large files
    * @param {File} file - The file to upload
@@ -234,30 +269,45 @@ class ApiService {
     const { upload_id, chunk_size, total_chunks } = initResponse.data
     
     try {
-      // Upload chunks
-      for (let chunkNumber = 0; chunkNumber < total_chunks; chunkNumber++) {
-        const start = chunkNumber * chunk_size
-        const end = Math.min(start + chunk_size, file.size)
-        const chunk = file.slice(start, end)
-        
-        const formData = new FormData()
-        formData.append('upload_id', upload_id)
-        formData.append('chunk_number', chunkNumber)
-        formData.append('chunk_data', chunk, `chunk_${chunkNumber}`)
-        
-        await this.axios.post('/files/chunked/upload', formData, {
-          headers: {
-            'Content-Type': 'multipart/form-data'
+      // Upload chunks, several at a time, the server accepts them in any order
+      let nextChunk = 0
+      let uploadedChunks = 0
+      
+      const uploadNextChunks = async () => {
+        while (nextChunk < total_chunks) {
+          const chunkNumber = nextChunk++
+          const start = chunkNumber * chunk_size
+          const end = Math.min(start + chunk_size, file.size)
+          const chunk = file.slice(start, end)
+          
+          const formData = new FormData()
+          formData.append('upload_id', upload_id)
+          formData.append('chunk_number', chunkNumber)
+          formData.append('chunk_data', chunk, `chunk_${chunkNumber}`)
+          
+          // Let the server verify the chunk (WebCrypto is only available in secure contexts)
+          const checksum = await this.sha256Hex(chunk)
+          if (checksum) {
+            formData.append('checksum', checksum)
+          }
+          
+          await this.axios.post('/files/chunked/upload', formData, {
+            headers: {
+              'Content-Type': 'multipart/form-data'
+            }
+          })
+          
+          // Report progress
+          uploadedChunks++
+          if (onProgress) {
+            onProgress(uploadedChunks / total_chunks)
           }
-        })
-        
-        // Report progress
-        if (onProgress) {
-          const progress = (chunkNumber + 1) / total_chunks
-          onProgress(progress)
         }
       }
       
+      const workers = Math.min(PARALLEL_CHUNK_UPLOADS, total_chunks)
+      await Promise.all(Array.from({ length: workers }, uploadNextChunks))
+      
       // Complete the upload
       const completeResponse = await this.axios.post('/files/chunked/complete', {
         upload_id: upload_id
@@ -276,6 +326,29 @@ class ApiService {
     }
   }
 
+  /**
+   * SHA-256 of a blob as a hex string, or null if WebCrypto is not available
+   * @param {Blob} blob - The data to hash
+   * @returns {Promise<string|null>} The hex digest
+   */
+  async sha256Hex(blob) {
+    if (!window.crypto?.subtle) {
+      return null
+    }
+    const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer())
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('')
+  }
+
+  /**
+   * Get the state of a chunked upload, used to resume it
+   * @param {string} uploadId - The upload ID returned by /files/chunked/init
+   * @returns {Promise<Object>} Status with missing_chunks as inclusive [first, last] ranges
+   */
+  async getChunkedUploadStatus(uploadId) {
+    const response = await this.axios.get(`/files/chunked/${uploadId}/status`)
+    return response.data
+  }
+
   /**
    * Get files with optional filters
    * @param {Object} filters - Filter options
@@ -513,6 +586,7 @@ class ApiService {
     return await this.request(`/files/${fileId}/extent`)
   }
 
+
   /**
    * Get file preview URL
    * @param {string} fileId - The file ID